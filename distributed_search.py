@@ -0,0 +1,699 @@
+"""
+Search one puzzle with workers on many hosts
+
+A Coordinator splits the search below a puzzle into work units, each the
+subtree below a configuration named by its state_key, and serves them over
+TCP.  Workers, started with work on any host that can reach it, take
+units one at a time and search them with a puzzle_tools solver, within a
+node limit.  A unit that outgrows the limit comes back split along the
+tree its search grew: the configurations left unexpanded become units of
+their own, so big subtrees spread over idle workers.  When a unit is
+solved, or fails, or time runs out, every worker is told to cancel its
+unit and stop.
+
+Units are kept apart by the configurations the coordinator knows to be
+reached, those of its first layers and of the trees workers send back:
+a unit's search enters none of them but its own.  Each configuration is
+still searched, by the unit of the last such configuration on any path
+to it, but on puzzles whose moves can be undone, units do not each search
+the whole connected graph, and what one unit expanded is not searched
+again.
+
+Messages are pickled, so a coordinator and its workers must trust one
+another; connections are authenticated with a shared key.
+"""
+import os
+import threading
+from multiprocessing import AuthenticationError, Process
+from multiprocessing.connection import Listener, Client
+from queue import Queue
+from time import time
+from puzzle import Puzzle
+from puzzle_tools import (SOLVERS, INCOMPLETE_STRATEGIES, SOLVED, UNSOLVABLE,
+                          BUDGET_EXCEEDED, SolveResult, anytime_solve,
+                          path_from_list, list_from_path)
+
+# status a worker reports for a unit whose search raised an exception
+_FAILED = "failed"
+
+
+class Coordinator:
+    """
+    Serves the work units of a search for a solution of a puzzle to
+    workers, and puts their results together.
+    """
+
+    def __init__(self, puzzle, authkey, strategy="dfs",
+                 address=("127.0.0.1", 0), units=64, unit_nodes=100000):
+        """
+        Create a new Coordinator self listening at address, a (host, port)
+        pair with port 0 for any free port, for workers knowing authkey.
+
+        Work starts as at least units units, if the puzzle has that many
+        configurations a few moves in, which workers search with the
+        solver named strategy in puzzle_tools.SOLVERS, expanding at most
+        unit_nodes nodes before handing a unit back to be split.  puzzle
+        must implement the compact key methods.  Strategies that may give
+        up on a unit with a solution, INCOMPLETE_STRATEGIES, are refused.
+
+        @type self: Coordinator
+        @type puzzle: Puzzle
+        @type authkey: bytes
+        @type strategy: str
+        @type address: (str, int)
+        @type units: int
+        @type unit_nodes: int
+        @rtype: None
+        """
+        if strategy not in SOLVERS:
+            raise ValueError("unknown strategy {!r}".format(strategy))
+        if strategy in INCOMPLETE_STRATEGIES:
+            raise ValueError("strategy {!r} is incomplete".format(strategy))
+        self.puzzle, self.strategy = puzzle, strategy
+        self.units, self.unit_nodes = units, unit_nodes
+        self._listener = Listener(address, authkey=authkey, backlog=64)
+        # parents maps each key reached to the key it was reached from,
+        # and _reached lists those keys in the order they were reached;
+        # _queue holds the keys of units not yet taken, the last first
+        self._parents, self._reached = {}, []
+        self._queue, self._in_flight = [], 0
+        self._nodes, self._solution = 0, None
+        self._status = self._reason = None
+        self._lock = threading.Condition()
+        # connections to workers, each with a lock for sending on it
+        self._connections = {}
+
+    @property
+    def address(self):
+        """
+        Return the (host, port) address workers connect to.
+
+        @type self: Coordinator
+        @rtype: (str, int)
+        """
+        return self._listener.address
+
+    def solve(self, timeout=None):
+        """
+        Return a SolveResult from searching with the workers that connect
+        to Coordinator self until a solution is found, every unit has
+        been searched, or timeout seconds pass.  Its nodes are those the
+        workers expanded.
+
+        @type self: Coordinator
+        @type timeout: float | None
+        @rtype: SolveResult
+        """
+        start = time()
+        deadline = None if timeout is None else start + timeout
+        self._partition()
+        threading.Thread(target=self._accept, daemon=True).start()
+        with self._lock:
+            while self._status is None:
+                remaining = None if deadline is None else deadline - time()
+                if remaining is not None and remaining <= 0:
+                    self._finish(BUDGET_EXCEEDED, "timed out")
+                    break
+                self._lock.wait(remaining)
+            status = self._status
+        solution = None
+        if self._solution is not None:
+            key, suffix = self._solution
+            keys = []
+            while key is not None:
+                keys.append(key)
+                key = self._parents[key]
+            keys.reverse()
+            keys.extend(suffix)
+            solution = path_from_list(
+                [self.puzzle] +
+                [self.puzzle.from_state_key(k) for k in keys[1:]])
+        return SolveResult(status, solution, self._nodes, time() - start,
+                           reason=self._reason)
+
+    def close(self):
+        """
+        Stop Coordinator self listening for workers.  Until then, workers
+        that connect after the search is over are told to stop.
+
+        @type self: Coordinator
+        @rtype: None
+        """
+        self._listener.close()
+
+    def _partition(self):
+        """
+        Fill the queue of Coordinator self with the units of the first
+        layer of configurations with at least self.units of them, finishing
+        at once if a solution comes first or there is no such layer.
+
+        @type self: Coordinator
+        @rtype: None
+        """
+        puzzle = self.puzzle
+        key = puzzle.state_key()
+        self._reach(key, None)
+        if puzzle.key_is_solved(key):
+            self._solution = key, []
+            self._status = SOLVED
+            return
+        layer = [key]
+        while layer and len(layer) < self.units:
+            next_layer = []
+            for key in layer:
+                for child in puzzle.key_extensions(key):
+                    if child not in self._parents:
+                        self._reach(child, key)
+                        if puzzle.key_is_solved(child):
+                            self._solution = child, []
+                            self._status = SOLVED
+                            return
+                        next_layer.append(child)
+            layer = next_layer
+        self._queue = layer[::-1]
+        if not layer:
+            self._status = UNSOLVABLE
+
+    def _reach(self, key, parent):
+        """
+        Record that Coordinator self reached the configuration with key
+        from that with key parent.  The caller holds self._lock, if the
+        search has started.
+
+        @type self: Coordinator
+        @type key: object
+        @type parent: object | None
+        @rtype: None
+        """
+        self._parents[key] = parent
+        self._reached.append(key)
+
+    def _accept(self):
+        """
+        Serve each worker connecting to Coordinator self in a thread of its
+        own, until the listener is closed.
+
+        @type self: Coordinator
+        @rtype: None
+        """
+        while True:
+            try:
+                connection = self._listener.accept()
+            except (AuthenticationError, ConnectionError, EOFError):
+                continue  # a failed handshake
+            except OSError:
+                return  # closed
+            threading.Thread(target=self._serve, args=(connection,),
+                             daemon=True).start()
+
+    def _serve(self, connection):
+        """
+        Send units to the worker at the other end of connection, and
+        record its results, until the search is over or it disconnects,
+        in which case the unit it held goes back on the queue.
+
+        @type self: Coordinator
+        @type connection: multiprocessing.connection.Connection
+        @rtype: None
+        """
+        send_lock = threading.Lock()
+        with self._lock:
+            self._connections[connection] = send_lock
+        # keys reached that have been sent to the worker, with units, to
+        # keep out of its searches
+        key, sent = None, 0
+        try:
+            with send_lock:
+                connection.send(("puzzle", self.puzzle, self.strategy))
+            while True:
+                # a request for a unit, with the result of the last one, so
+                # that each exchange is one message each way
+                _, report = connection.recv()
+                if report is not None:
+                    self._report(*report)
+                key = self._take()
+                if key is None:
+                    with send_lock:
+                        connection.send(("done",))
+                    break
+                with self._lock:
+                    reached = self._reached[sent:]
+                sent += len(reached)
+                with send_lock:
+                    connection.send(("unit", key, self.unit_nodes, reached))
+        except (EOFError, OSError):
+            with self._lock:
+                if key is not None:
+                    self._in_flight -= 1
+                    self._queue.append(key)
+                    self._lock.notify_all()
+        finally:
+            with self._lock:
+                del self._connections[connection]
+            connection.close()
+
+    def _take(self):
+        """
+        Return the key of the next unit for a worker, waiting for one if
+        others are still being searched, or None if the search is over.
+        Units with nothing below them to search are settled here.
+
+        @type self: Coordinator
+        @rtype: object | None
+        """
+        puzzle, parents = self.puzzle, self._parents
+        with self._lock:
+            while True:
+                while (self._status is None and not self._queue and
+                       self._in_flight):
+                    self._lock.wait()
+                if self._status is not None or not self._queue:
+                    return None
+                key = self._queue.pop()
+                # an unsolved unit whose extensions are all reached holds
+                # nothing to search, and is common once units close in on
+                # each other; it is not worth a round trip to a worker
+                if (puzzle.key_is_solved(key) or
+                        not all([child in parents for child in
+                                 puzzle.key_extensions(key)])):
+                    self._in_flight += 1
+                    return key
+                self._nodes += 1
+                if not self._queue and not self._in_flight:
+                    self._finish(UNSOLVABLE)
+
+    def _report(self, key, status, nodes, suffix):
+        """
+        Record that the unit with key was searched to status in nodes
+        nodes.  suffix is the path of keys below it to a solution if it
+        was solved, the error message if it failed, and otherwise the
+        configurations its worker reached and those it left unexpanded, as
+        returned by _search_unit.
+
+        @type self: Coordinator
+        @type key: object
+        @type status: str
+        @type nodes: int
+        @type suffix: list | str | (list, list) | None
+        @rtype: None
+        """
+        with self._lock:
+            self._in_flight -= 1
+            self._nodes += nodes
+            if self._status is not None:
+                return
+            if status == SOLVED:
+                self._solution = key, suffix
+                self._finish(SOLVED)
+                return
+            if status == _FAILED:
+                self._finish(BUDGET_EXCEEDED, "unit failed: " + suffix)
+                return
+            if status in (UNSOLVABLE, BUDGET_EXCEEDED):
+                # every configuration the worker expanded has its
+                # extensions reached too; those it left unexpanded, unless
+                # reached already, become units of their own
+                tree, frontier = suffix
+                frontier = set(frontier)
+                for child, parent in tree:
+                    if child not in self._parents:
+                        self._reach(child, parent)
+                        if child in frontier:
+                            self._queue.append(child)
+            if not self._queue and not self._in_flight:
+                self._finish(UNSOLVABLE)
+            self._lock.notify_all()
+
+    def _finish(self, status, reason=None):
+        """
+        End the search of Coordinator self with status, for reason if it
+        stopped early, telling every worker to cancel its unit.  The
+        caller holds self._lock.
+
+        @type self: Coordinator
+        @type status: str
+        @type reason: str | None
+        @rtype: None
+        """
+        self._status, self._reason = status, reason
+        for connection, send_lock in list(self._connections.items()):
+            try:
+                with send_lock:
+                    connection.send(("cancel",))
+            except OSError:
+                pass
+        self._lock.notify_all()
+
+
+class _Unit(Puzzle):
+    """
+    A configuration of a puzzle whose extensions leave out those a
+    Coordinator has reached, which other units search below, and which
+    records the configurations a search of it expands.
+    """
+
+    def __init__(self, puzzle, reached, expanded):
+        """
+        Create a new _Unit self of the configuration of puzzle, extending
+        to no configuration whose state_key is in reached.  expanded maps
+        the state_key of each configuration expanded by searches of self
+        or of the _Units it extends to, as they are expanded, to those of
+        its extensions.
+
+        @type self: _Unit
+        @type puzzle: Puzzle
+        @type reached: set
+        @type expanded: dict
+        @rtype: None
+        """
+        self._puzzle, self._reached, self.expanded = puzzle, reached, expanded
+
+    def __getattr__(self, name):
+        """
+        Return attribute name of the puzzle of _Unit self, for the methods
+        of puzzles that are not Puzzle's own, such as key_is_solved.
+
+        @type self: _Unit
+        @type name: str
+        @rtype: object
+        """
+        return getattr(self._puzzle, name)
+
+    def __eq__(self, other):
+        """
+        Return whether _Unit self is equivalent to other.
+
+        @type self: _Unit
+        @type other: _Unit | Any
+        @rtype: bool
+        """
+        return type(other) == _Unit and self._puzzle == other._puzzle
+
+    def __hash__(self):
+        """
+        Return a hash of _Unit self.
+
+        @type self: _Unit
+        @rtype: int
+        """
+        return hash(self._puzzle)
+
+    def __str__(self):
+        """
+        Return a human-readable string representing _Unit self.
+
+        @type self: _Unit
+        @rtype: str
+        """
+        return str(self._puzzle)
+
+    def is_solved(self):
+        """
+        Return whether _Unit self is solved.
+
+        @type self: _Unit
+        @rtype: bool
+        """
+        return self._puzzle.is_solved()
+
+    def fail_fast(self):
+        """
+        Return True iff _Unit self can never be solved.
+
+        @type self: _Unit
+        @rtype: bool
+        """
+        return self._puzzle.fail_fast()
+
+    def extensions(self):
+        """
+        Return the extensions of _Unit self that are not reached,
+        recording its expansion.
+
+        @type self: _Unit
+        @rtype: list[_Unit]
+
+        >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        >>> grid = [["*", "*", ".", "*", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+        >>> reached = {gpsp.key_extensions(gpsp.state_key())[0]}
+        >>> [str(x)[:5] for x in _Unit(gpsp, reached, {}).extensions()]
+        ['..***']
+        """
+        reached, expanded = self._reached, self.expanded
+        extensions, keys = [], []
+        for x in self._puzzle.extensions():
+            key = x.state_key()
+            if key not in reached:
+                extensions.append(_Unit(x, reached, expanded))
+                keys.append(key)
+        expanded.setdefault(self.state_key(), keys)
+        return extensions
+
+    def order_extensions(self, extensions):
+        """
+        Return extensions, a list of extensions of _Unit self, in the
+        order of its puzzle's order_extensions.
+
+        @type self: _Unit
+        @type extensions: list[_Unit]
+        @rtype: list[_Unit]
+        """
+        return [_Unit(x, self._reached, self.expanded) for x in
+                self._puzzle.order_extensions([x._puzzle for x in extensions])]
+
+    def state_key(self):
+        """
+        Return the state_key of the configuration of _Unit self.
+
+        @type self: _Unit
+        @rtype: object
+        """
+        return self._puzzle.state_key()
+
+    def from_state_key(self, key):
+        """
+        Return the _Unit whose configuration has state_key key.
+
+        @type self: _Unit
+        @type key: object
+        @rtype: _Unit
+        """
+        return _Unit(self._puzzle.from_state_key(key), self._reached,
+                     self.expanded)
+
+    def key_extensions(self, key):
+        """
+        Return the state keys of the extensions of the configuration with
+        state_key key that are not reached, recording its expansion.
+
+        @type self: _Unit
+        @type key: object
+        @rtype: list
+        """
+        reached = self._reached
+        children = [child for child in self._puzzle.key_extensions(key)
+                    if child not in reached]
+        self.expanded.setdefault(key, children)
+        return children
+
+    def key_rank(self, key):
+        """
+        Return the key_rank of the configuration with state_key key.
+
+        @type self: _Unit
+        @type key: object
+        @rtype: object
+        """
+        return self._puzzle.key_rank(key)
+
+
+def work(address, authkey):
+    """
+    Search units served by the Coordinator at address, a (host, port)
+    pair, until it has no more.  Return the number of units searched.
+
+    A unit whose search raises an exception is reported as failed, which
+    ends the search.
+
+    @type address: (str, int)
+    @type authkey: bytes
+    @rtype: int
+    """
+    try:
+        connection = Client(tuple(address), authkey=authkey)
+    except (EOFError, OSError):
+        return 0  # the coordinator finished before this worker joined
+    cancel, messages = threading.Event(), Queue()
+
+    def listen():
+        # pass messages on, except cancellations, which may come at any
+        # time and cancel the unit being searched
+        try:
+            while True:
+                message = connection.recv()
+                if message[0] == "cancel":
+                    cancel.set()
+                else:
+                    messages.put(message)
+        except (EOFError, OSError):
+            cancel.set()
+            messages.put(("done",))
+
+    threading.Thread(target=listen, daemon=True).start()
+    count = 0
+    try:
+        message = messages.get()
+        if message[0] == "done":
+            return count
+        _, puzzle, strategy = message
+        # keys of configurations reached by the coordinator, which only
+        # the units they name search below
+        reached, report = set(), None
+        while not cancel.is_set():
+            connection.send(("steal", report))
+            message = messages.get()
+            if message[0] == "done":
+                break
+            _, key, max_nodes, new = message
+            reached.update(new)
+            try:
+                report = (key,) + _search_unit(
+                    _Unit(puzzle.from_state_key(key), reached, {}), strategy,
+                    max_nodes, cancel)
+            except Exception as e:
+                report = key, _FAILED, 0, "{}: {}".format(type(e).__name__, e)
+            count += 1
+    except (EOFError, OSError):
+        pass  # the coordinator has gone
+    finally:
+        connection.close()
+    return count
+
+
+def _search_unit(unit, strategy, max_nodes, cancel):
+    """
+    Return the status of a search of unit, a _Unit that has expanded
+    nothing yet, with strategy, expanding at most max_nodes nodes until
+    cancel is set, the nodes expanded, and what the Coordinator needs to
+    know of it: for SOLVED, the state keys of the path below unit to a
+    solution; otherwise the (state key, parent's state key) pairs of the
+    configurations the search reached, in the order reached, and the keys
+    of those among them it left unexpanded, which only BUDGET_EXCEEDED
+    leaves.
+
+    @type unit: _Unit
+    @type strategy: str
+    @type max_nodes: int
+    @type cancel: threading.Event
+    @rtype: (str, int, object)
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", ".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> status, nodes, (tree, frontier) = _search_unit(
+    ...     _Unit(gpsp, set(), {}), "dfs", 1, threading.Event())
+    >>> status, nodes, len(tree), len(frontier)
+    ('budget-exceeded', 2, 2, 2)
+    """
+    result = anytime_solve(unit, SOLVERS[strategy], max_nodes=max_nodes,
+                           token=cancel)
+    if result.status == SOLVED:
+        return SOLVED, result.nodes, [
+            p.state_key() for p in list_from_path(result.solution)[1:]]
+    # the tree the search grew is kept out of later units, and a unit
+    # that outgrew its limit splits along it, expanding at least its own
+    # configuration, so that no search is done again
+    key, expanded = unit.state_key(), unit.expanded
+    if result.status == BUDGET_EXCEEDED and key not in expanded:
+        unit.key_extensions(key)
+    seen, tree = {key}, []
+    for parent, children in expanded.items():
+        for child in children:
+            if child not in seen:
+                seen.add(child)
+                tree.append((child, parent))
+    if result.status == UNSOLVABLE:
+        # what it left unexpanded, such as by fail_fast, has no solution
+        return UNSOLVABLE, result.nodes, (tree, [])
+    return BUDGET_EXCEEDED, result.nodes, (
+        tree, [child for child, _ in tree if child not in expanded])
+
+
+def distributed_solve(puzzle, workers=None, strategy="dfs", timeout=None,
+                      units=64, unit_nodes=100000):
+    """
+    Return a SolveResult from searching for a solution of puzzle with a
+    Coordinator on this host and workers worker processes connected to
+    it over TCP, by default one for each CPU.
+
+    @type puzzle: Puzzle
+    @type workers: int | None
+    @type strategy: str
+    @type timeout: float | None
+    @type units: int
+    @type unit_nodes: int
+    @rtype: SolveResult
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> grid += [[".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> result = distributed_solve(gpsp, 3, units=4, unit_nodes=5)
+    >>> path = list_from_path(result.solution)
+    >>> result.status, len(path), path[-1].is_solved()
+    ('solved', 11, True)
+    >>> all(path[i + 1] in path[i].extensions() for i in range(10))
+    True
+    >>> gpsp = GridPegSolitairePuzzle(grid[:3], {"*", "."})
+    >>> distributed_solve(gpsp, 2).status
+    'unsolvable'
+    >>> from mn_puzzle import MNPuzzle
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle((("2", "1", "3"), ("4", "5", "*")), target_grid)
+    >>> distributed_solve(m, 2, units=8, unit_nodes=20).status
+    'unsolvable'
+    """
+    authkey = os.urandom(16)
+    coordinator = Coordinator(puzzle, authkey, strategy, units=units,
+                              unit_nodes=unit_nodes)
+    processes = [Process(target=work, args=(coordinator.address, authkey),
+                         daemon=True)
+                 for _ in range(workers or os.cpu_count() or 1)]
+    for process in processes:
+        process.start()
+    try:
+        return coordinator.solve(timeout)
+    except BaseException:
+        # workers may be waiting on a coordinator that never served them
+        for process in processes:
+            process.terminate()
+        raise
+    finally:
+        for process in processes:
+            process.join()
+        coordinator.close()
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) == 3:
+        # python distributed_search.py HOST PORT, with the coordinator's
+        # key in the environment variable PUZZLE_AUTHKEY
+        print("searched {} units".format(
+            work((sys.argv[1], int(sys.argv[2])),
+                 os.environ["PUZZLE_AUTHKEY"].encode())))
+    else:
+        import doctest
+        doctest.testmod()
+        from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+        grid = [["*", "*", ".", "*", "*"],
+                ["*", "*", "*", "*", "*"],
+                ["*", "*", "*", "*", "*"],
+                ["*", "*", ".", "*", "*"],
+                ["*", "*", "*", "*", "*"]]
+        gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        for workers in (1, 4):
+            print("5x5 peg solitaire with {} workers: {}".format(
+                workers, distributed_solve(gpsp, workers, units=16,
+                                           unit_nodes=20000)))
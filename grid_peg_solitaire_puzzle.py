@@ -22,6 +22,9 @@ class GridPegSolitairePuzzle(Puzzle):
         assert all([all(x in marker_set for x in row) for row in marker])
         assert all([x == "*" or x == "." or x == "#" for x in marker_set])
         self._marker, self._marker_set = marker, marker_set
+        # jump and cell tables for key_extensions and key_rank, built on
+        # first use
+        self._jumps = self._cells = None
 
 
     def __str__(self):
@@ -77,6 +80,21 @@ class GridPegSolitairePuzzle(Puzzle):
                 (self._marker == other._marker) and
                 (self._marker_set == other._marker_set))
 
+    def __hash__(self):
+        """
+        Return a hash of GridPegSolitairePuzzle self consistent with __eq__.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "*", ".", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> gpsp_2 = GridPegSolitairePuzzle([x[:] for x in grid], {"*", "."})
+        >>> hash(gpsp) == hash(gpsp_2)
+        True
+        """
+        return hash(tuple(tuple(row) for row in self._marker))
+
     # legal extensions consist of all configurations that can be reached by
     # making a single jump from this configuration
 
@@ -156,6 +174,29 @@ class GridPegSolitairePuzzle(Puzzle):
         return list_extensions
 
 
+    # override order_extensions
+    # a lone peg can only be removed once another peg comes next to it, and
+    # pegs near the edges have fewer jumps available, so try first the jumps
+    # leaving the fewest isolated pegs and then the pegs closest to the centre
+
+    def order_extensions(self, extensions):
+        """
+        Return extensions, a list of extensions of GridPegSolitairePuzzle
+        self, with those keeping pegs connected and central first.
+
+        @type self: GridPegSolitairePuzzle
+        @type extensions: list[GridPegSolitairePuzzle]
+        @rtype: list[GridPegSolitairePuzzle]
+
+        >>> grid = [[".", "*", "*", ".", "*", "*", "."]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+        >>> [str(x)[:7] for x in gpsp.extensions()]
+        ['*...**.', '.***...', '...***.', '.**...*']
+        >>> [str(x)[:7] for x in gpsp.order_extensions(gpsp.extensions())]
+        ['.***...', '...***.', '*...**.', '.**...*']
+        """
+        return sorted(extensions, key=lambda x: x.key_rank(x.state_key()))
+
     # override is_solved()
     # A configuration is solved when there is exactly one "*" left
 
@@ -183,6 +224,201 @@ class GridPegSolitairePuzzle(Puzzle):
 
         return count == 1
 
+    # compact keys
+    # a configuration is keyed by the int whose bit i * width + j is set
+    # iff there is a peg at row i, column j
+
+    def state_key(self):
+        """
+        Return a compact key for the configuration of
+        GridPegSolitairePuzzle self.
+
+        @type self: GridPegSolitairePuzzle
+        @rtype: int
+
+        >>> grid = [["*", "*", ".", "#"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> bin(gpsp.state_key())
+        '0b11'
+        """
+        key, width = 0, len(self._marker[0])
+        for i in range(len(self._marker)):
+            for j in range(width):
+                if self._marker[i][j] == "*":
+                    key |= 1 << (i * width + j)
+        return key
+
+    def from_state_key(self, key):
+        """
+        Return the GridPegSolitairePuzzle on the same board as self whose
+        configuration has state_key key.
+
+        @type self: GridPegSolitairePuzzle
+        @type key: int
+        @rtype: GridPegSolitairePuzzle
+
+        >>> grid = [["*", "*", ".", "#"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> print(gpsp.from_state_key(0b100))
+        ..*#
+        _____
+        """
+        width = len(self._marker[0])
+        grid_ = [["#" if self._marker[i][j] == "#" else
+                  "*" if key >> (i * width + j) & 1 else "."
+                  for j in range(width)]
+                 for i in range(len(self._marker))]
+        return GridPegSolitairePuzzle(grid_, self._marker_set)
+
+    def key_extensions(self, key):
+        """
+        Return the state keys of the extensions of the configuration with
+        state_key key, in the same order as extensions.
+
+        @type self: GridPegSolitairePuzzle
+        @type key: int
+        @rtype: list[int]
+
+        >>> grid = [["*", "*", ".", "*", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> keys = gpsp.key_extensions(gpsp.state_key())
+        >>> [gpsp.from_state_key(k) for k in keys] == gpsp.extensions()
+        True
+        """
+        if self._jumps is None:
+            self._jumps = _jump_table(self._marker)
+        return [key ^ move for target, over_source, move in self._jumps
+                if not key & target and key & over_source == over_source]
+
+    def key_is_solved(self, key):
+        """
+        Return whether the configuration with state_key key is solved.
+
+        @type self: GridPegSolitairePuzzle
+        @type key: int
+        @rtype: bool
+
+        >>> grid = [["*", ".", ".", "."]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> gpsp.key_is_solved(gpsp.state_key())
+        True
+        """
+        return key != 0 and key & (key - 1) == 0
+
+    def key_heuristic(self, key):
+        """
+        Return the number of jumps left to solve the configuration with
+        state_key key, if it can be solved: each jump removes one peg.
+
+        @type self: GridPegSolitairePuzzle
+        @type key: int
+        @rtype: int
+
+        >>> grid = [["*", "*", ".", "*"]]
+        >>> gpsp = GridPegSolitairePuzzle(grid, {"*", ".", "#"})
+        >>> gpsp.key_heuristic(gpsp.state_key())
+        2
+        """
+        return max(bin(key).count("1") - 1, 0)
+
+    # override key_rank
+    # every configuration of a layer has as many pegs, so rank those with
+    # equal heuristics as order_extensions does
+
+    def key_rank(self, key):
+        """
+        Return the number of pegs of the configuration with state_key key,
+        the number of those with no peg beside them, and the sum of their
+        distances from the centre of the board.
+
+        @type self: GridPegSolitairePuzzle
+        @type key: int
+        @rtype: (int, int, int)
+
+        >>> gpsp = GridPegSolitairePuzzle([["*", ".", "*", "*"]], {"*", "."})
+        >>> gpsp.key_rank(gpsp.state_key())
+        (3, 1, 7)
+        """
+        if self._cells is None:
+            self._cells = _cell_table(self._marker)
+        isolated = distance = 0
+        for bit, beside, doubled_distance in self._cells:
+            if key & bit:
+                distance += doubled_distance
+                if not key & beside:
+                    isolated += 1
+        return bin(key).count("1"), isolated, distance
+
+
+# board layout -> jump table, shared by every puzzle on that board
+_JUMP_TABLES = {}
+
+
+def _jump_table(marker):
+    """
+    Return the jumps possible on the board of marker as a list of
+    (target bit, over and source bits, all three bits) triples, in the
+    order extensions tries them.
+
+    @type marker: list[list[str]]
+    @rtype: list[(int, int, int)]
+
+    >>> _jump_table([["*", "*", "."]])
+    [(1, 6, 7), (4, 3, 7)]
+    """
+    board = tuple(tuple(x == "#" for x in row) for row in marker)
+    if board not in _JUMP_TABLES:
+        height, width = len(board), len(board[0])
+        table = []
+        for i in range(height):
+            for j in range(width):
+                for di, dj in ((0, 1), (0, -1), (1, 0), (-1, 0)):
+                    cells = [(i + k * di, j + k * dj) for k in range(3)]
+                    if all(0 <= r < height and 0 <= c < width and
+                           not board[r][c] for r, c in cells):
+                        bits = [1 << (r * width + c) for r, c in cells]
+                        table.append((bits[0], bits[1] | bits[2],
+                                      bits[0] | bits[1] | bits[2]))
+        _JUMP_TABLES[board] = table
+    return _JUMP_TABLES[board]
+
+
+# board layout -> cell table, shared by every puzzle on that board
+_CELL_TABLES = {}
+
+
+def _cell_table(marker):
+    """
+    Return the cells of the board of marker that may hold pegs as a list
+    of (cell bit, bits of the cells beside it, twice its distance from the
+    centre of the board) triples.
+
+    @type marker: list[list[str]]
+    @rtype: list[(int, int, int)]
+
+    >>> _cell_table([["*", "*", "#"]])
+    [(1, 2, 2), (2, 5, 0)]
+    """
+    board = tuple(tuple(x == "#" for x in row) for row in marker)
+    if board not in _CELL_TABLES:
+        height, width = len(board), len(board[0])
+        table = []
+        for i in range(height):
+            for j in range(width):
+                if not board[i][j]:
+                    beside = 0
+                    for r, c in ((i, j + 1), (i, j - 1), (i + 1, j),
+                                 (i - 1, j)):
+                        if 0 <= r < height and 0 <= c < width:
+                            beside |= 1 << (r * width + c)
+                    # distances are doubled to stay whole on even-sized
+                    # boards
+                    table.append((1 << (i * width + j), beside,
+                                  abs(2 * i - height + 1) +
+                                  abs(2 * j - width + 1)))
+        _CELL_TABLES[board] = table
+    return _CELL_TABLES[board]
+
 
 if __name__ == "__main__":
     import doctest
@@ -0,0 +1,170 @@
+"""
+Exact distance-to-goal tables for small MNPuzzle boards
+
+A table for a goal to_grid holds one byte per permutation rank of an
+MNPuzzle configuration (see MNPuzzle.rank_of_key): the least number of
+moves from that configuration to to_grid, or UNREACHABLE.  It is built
+once by a breadth-first search back from to_grid, stored as a raw file,
+and memory-mapped to answer queries by greedy descent, without search.
+
+Tables take (n * m)! bytes: 363 KB for 3x3, 3.6 MB for 2x5 and 479 MB
+for 2x6 or 3x4 boards.
+"""
+import mmap
+from array import array
+from mn_puzzle import MNPuzzle
+from puzzle_tools import path_from_list
+
+# table entry of configurations that cannot reach the goal
+UNREACHABLE = 255
+
+
+def build_distance_table(to_grid, path=None):
+    """
+    Return the distance table for goal to_grid, writing it to the file
+    path as well if path is given.
+
+    @type to_grid: tuple[tuple[str]]
+    @type path: str | None
+    @rtype: bytearray
+
+    >>> table = build_distance_table((("1", "2"), ("3", "*")))
+    >>> len(table), max(d for d in table if d != UNREACHABLE)
+    (24, 6)
+    """
+    goal = MNPuzzle(to_grid, to_grid)
+    table = bytearray([UNREACHABLE]) * goal.rank_count()
+    rank = goal.rank()
+    table[rank] = 0
+    typecode = "I" if len(table) <= 2 ** 32 else "Q"
+    layer, depth = array(typecode, [rank]), 0
+    while layer:
+        next_layer = array(typecode)
+        for rank in layer:
+            for child in goal.key_extensions(goal.key_of_rank(rank)):
+                child_rank = goal.rank_of_key(child)
+                if table[child_rank] == UNREACHABLE:
+                    table[child_rank] = depth + 1
+                    next_layer.append(child_rank)
+        layer, depth = next_layer, depth + 1
+    if path is not None:
+        with open(path, "wb") as f:
+            f.write(table)
+    return table
+
+
+class DistanceTable:
+    """
+    The distance table of a goal configuration, answering queries about
+    MNPuzzles working towards it.
+    """
+
+    def __init__(self, to_grid, table):
+        """
+        Create a new DistanceTable self for goal to_grid, with entries
+        table as returned by build_distance_table.
+
+        @type self: DistanceTable
+        @type to_grid: tuple[tuple[str]]
+        @type table: bytearray | bytes | mmap.mmap
+        @rtype: None
+        """
+        self._goal = MNPuzzle(to_grid, to_grid)
+        assert len(table) == self._goal.rank_count()
+        self.to_grid, self._table = to_grid, table
+
+    def distance(self, puzzle):
+        """
+        Return the least number of moves that solve MNPuzzle puzzle, or
+        None if it cannot be solved.
+
+        @type self: DistanceTable
+        @type puzzle: MNPuzzle
+        @rtype: int | None
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> t = DistanceTable(target_grid, build_distance_table(target_grid))
+        >>> t.distance(MNPuzzle((("*", "2", "3"), ("1", "4", "5")),
+        ...                     target_grid))
+        3
+        >>> t.distance(MNPuzzle((("2", "1", "3"), ("4", "5", "*")),
+        ...                     target_grid)) is None
+        True
+        """
+        assert puzzle.to_grid == self.to_grid
+        d = self._table[self._goal.rank_of_key(puzzle.state_key())]
+        return None if d == UNREACHABLE else d
+
+    def solve(self, puzzle):
+        """
+        Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+        containing a solution, with each child containing an extension
+        of the puzzle in its parent.  Return None if this is not possible.
+
+        @type self: DistanceTable
+        @type puzzle: MNPuzzle
+        @rtype: PuzzleNode | None
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> t = DistanceTable(target_grid, build_distance_table(target_grid))
+        >>> print(t.solve(MNPuzzle((("1", "2", "3"), ("4", "*", "5")),
+        ...                        target_grid)))
+        123
+        4*5
+        _____
+        <BLANKLINE>
+        123
+        45*
+        _____
+        <BLANKLINE>
+        <BLANKLINE>
+        """
+        distance = self.distance(puzzle)
+        if distance is None:
+            return None
+        goal, table = self._goal, self._table
+        key, keys = puzzle.state_key(), []
+        # some extension of each configuration is one move closer
+        for d in range(distance - 1, -1, -1):
+            key = next(k for k in goal.key_extensions(key)
+                       if table[goal.rank_of_key(k)] == d)
+            keys.append(key)
+        return path_from_list([puzzle] + [goal.from_state_key(k)
+                                          for k in keys])
+
+
+def open_distance_table(to_grid, path):
+    """
+    Return the DistanceTable for goal to_grid stored in the file path,
+    memory-mapped read-only so that processes share its pages.
+
+    @type to_grid: tuple[tuple[str]]
+    @type path: str
+    @rtype: DistanceTable
+    """
+    with open(path, "rb") as f:
+        return DistanceTable(to_grid,
+                             mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import os
+    import tempfile
+    from time import time
+    target_grid = (("1", "2", "3"), ("4", "5", "6"), ("7", "8", "*"))
+    path = os.path.join(tempfile.gettempdir(), "mn_3x3.table")
+    start = time()
+    build_distance_table(target_grid, path)
+    end = time()
+    print("built 3x3 table in {} seconds".format(end - start))
+    table = open_distance_table(target_grid, path)
+    puzzle = MNPuzzle((("8", "7", "6"), ("5", "4", "3"), ("2", "1", "*")),
+                      target_grid)
+    start = time()
+    for _ in range(1000):
+        solution = table.solve(puzzle)
+    end = time()
+    print("solved in {} moves in {} seconds".format(
+        table.distance(puzzle), (end - start) / 1000))
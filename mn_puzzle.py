@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from math import factorial
 
 
 class MNPuzzle(Puzzle):
@@ -24,6 +25,8 @@ class MNPuzzle(Puzzle):
         assert all([len(r) == len(to_grid[0]) for r in to_grid])
         self.n, self.m = len(from_grid), len(from_grid[0])
         self.from_grid, self.to_grid = from_grid, to_grid
+        # from_grid of the MNPuzzle this one is an extension of, if any
+        self._previous = None
 
     # TODO
     # implement __eq__ and __str__
@@ -53,6 +56,21 @@ class MNPuzzle(Puzzle):
                 self.from_grid == other.from_grid and
                 self.to_grid == other.to_grid)
 
+    def __hash__(self):
+        """
+        Return a hash of MNPuzzle self consistent with __eq__.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> hash(m) == hash(MNPuzzle(start_grid, target_grid))
+        True
+        """
+        return hash((self.from_grid, self.to_grid))
+
     def __str__(self):
         """
         Return a human-readable string representation of MNPuzzle self.
@@ -140,8 +158,39 @@ class MNPuzzle(Puzzle):
                             MNPuzzle(_extensions_helper_tuple_list(grid_copy),
                                      self.to_grid))
 
+        for x in list_extensions:
+            x._previous = self.from_grid
         return list_extensions
 
+    # override order_extensions
+    # moving a symbol back where it came from never helps, and moves that
+    # bring symbols closer to their places in to_grid are likelier to help
+    def order_extensions(self, extensions):
+        """
+        Return extensions, a list of extensions of MNPuzzle self, without
+        the one undoing the move that made self and in increasing order of
+        key_heuristic.
+
+        @type self: MNPuzzle
+        @type extensions: list[MNPuzzle]
+        @rtype: list[MNPuzzle]
+
+        >>> start_grid = (("1", "2", "3"), ("4", "*", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> [x.from_grid[1] for x in m.order_extensions(m.extensions())]
+        [('4', '5', '*'), ('*', '4', '5'), ('4', '2', '5')]
+        >>> m = m.order_extensions(m.extensions())[1]
+        >>> [x.from_grid for x in m.order_extensions(m.extensions())]
+        [(('*', '2', '3'), ('1', '4', '5'))]
+        """
+        extensions = [x for x in extensions if x.from_grid != self._previous]
+        try:
+            return sorted(extensions,
+                          key=lambda x: self.key_heuristic(x.state_key()))
+        except ValueError:  # from_grid and to_grid hold different symbols
+            return extensions
+
     # override is_solved
     # a configuration is solved when from_grid is the same as to_grid
     def is_solved(self):
@@ -163,6 +212,277 @@ class MNPuzzle(Puzzle):
         """
         return self.from_grid == self.to_grid
 
+    # compact keys
+    # a configuration is keyed by the bytes giving, for each cell in
+    # row-major order, the position its symbol occupies in to_grid
+    def state_key(self):
+        """
+        Return a compact key for the configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: bytes
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> list(MNPuzzle(start_grid, target_grid).state_key())
+        [5, 1, 2, 0, 3, 4]
+        """
+        position = _goal_positions(self.to_grid)
+        try:
+            return bytes([position[s] for row in self.from_grid for s in row])
+        except KeyError:
+            raise ValueError("from_grid and to_grid hold different symbols")
+
+    def from_state_key(self, key):
+        """
+        Return the MNPuzzle with the same to_grid as self whose
+        configuration has state_key key.
+
+        @type self: MNPuzzle
+        @type key: bytes
+        @rtype: MNPuzzle
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> m.from_state_key(m.state_key()) == m
+        True
+        """
+        symbols = [s for row in self.to_grid for s in row]
+        return MNPuzzle(tuple(tuple(symbols[key[i * self.m + j]]
+                                    for j in range(self.m))
+                              for i in range(self.n)),
+                        self.to_grid)
+
+    def key_extensions(self, key):
+        """
+        Return the state keys of the extensions of the configuration with
+        state_key key, in the same order as extensions.
+
+        @type self: MNPuzzle
+        @type key: bytes
+        @rtype: list[bytes]
+
+        >>> target_grid = (("1", "2"), ("3", "*"))
+        >>> s = MNPuzzle(target_grid, target_grid)
+        >>> keys = s.key_extensions(s.state_key())
+        >>> [s.from_state_key(k) for k in keys] == s.extensions()
+        True
+        """
+        blank = key.index(_goal_positions(self.to_grid)["*"])
+        list_extensions = []
+        for cell in _neighbours(self.n, self.m)[blank]:
+            child = bytearray(key)
+            child[blank], child[cell] = key[cell], key[blank]
+            list_extensions.append(bytes(child))
+        return list_extensions
+
+    def key_is_solved(self, key):
+        """
+        Return whether the configuration with state_key key is solved.
+
+        @type self: MNPuzzle
+        @type key: bytes
+        @rtype: bool
+
+        >>> target_grid = (("1", "2"), ("3", "*"))
+        >>> s = MNPuzzle(target_grid, target_grid)
+        >>> s.key_is_solved(s.state_key())
+        True
+        """
+        return key == bytes(range(self.n * self.m))
+
+    def key_heuristic(self, key):
+        """
+        Return the sum of the Manhattan distances of the symbols other
+        than "*" from their places in to_grid, in the configuration with
+        state_key key.  This never overestimates the moves left.
+
+        @type self: MNPuzzle
+        @type key: bytes
+        @rtype: int
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> m.key_heuristic(m.state_key())
+        3
+        """
+        blank = _goal_positions(self.to_grid)["*"]
+        distance = _manhattan(self.n, self.m)
+        return sum([distance[i][g] for i, g in enumerate(key) if g != blank])
+
+    # ranks
+    # a state_key is a permutation of the n * m positions, so it can be
+    # ranked to a dense int in [0, (n * m)!)
+
+    def rank_count(self):
+        """
+        Return the number of ranks of configurations of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(target_grid, target_grid).rank_count()
+        720
+        """
+        return factorial(self.n * self.m)
+
+    def rank(self):
+        """
+        Return the rank of the configuration of MNPuzzle self.
+
+        @type self: MNPuzzle
+        @rtype: int
+
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> MNPuzzle(target_grid, target_grid).rank()
+        719
+        """
+        return self.rank_of_key(self.state_key())
+
+    def rank_of_key(self, key):
+        """
+        Return the rank of the configuration with state_key key.
+
+        @type self: MNPuzzle
+        @type key: bytes
+        @rtype: int
+
+        >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+        >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+        >>> m = MNPuzzle(start_grid, target_grid)
+        >>> m.key_of_rank(m.rank_of_key(m.state_key())) == m.state_key()
+        True
+        """
+        return _rank_permutation(key)
+
+    def key_of_rank(self, rank):
+        """
+        Return the state_key of the configuration with rank rank.
+
+        @type self: MNPuzzle
+        @type rank: int
+        @rtype: bytes
+
+        >>> target_grid = (("1", "2"), ("3", "*"))
+        >>> s = MNPuzzle(target_grid, target_grid)
+        >>> ranks = [s.rank_of_key(s.key_of_rank(r)) for r in range(24)]
+        >>> ranks == list(range(24))
+        True
+        """
+        return _unrank_permutation(rank, self.n * self.m)
+
+
+# to_grid -> {symbol: position}, shared by every MNPuzzle with that goal
+_GOAL_POSITIONS = {}
+# (n, m) -> cells adjacent to each cell, in the order extensions tries them
+_NEIGHBOURS = {}
+# (n, m) -> Manhattan distance between each pair of cells
+_MANHATTAN = {}
+
+
+def _goal_positions(to_grid):
+    """
+    Return a dict mapping each symbol of to_grid to its row-major position.
+
+    @type to_grid: tuple[tuple[str]]
+    @rtype: dict[str, int]
+
+    >>> _goal_positions((("1", "2"), ("3", "*")))["*"]
+    3
+    """
+    if to_grid not in _GOAL_POSITIONS:
+        _GOAL_POSITIONS[to_grid] = {s: i for i, s in
+                                    enumerate(s for row in to_grid
+                                              for s in row)}
+    return _GOAL_POSITIONS[to_grid]
+
+
+def _manhattan(n, m):
+    """
+    Return the Manhattan distances between each pair of row-major
+    positions of an nxm grid.
+
+    @type n: int
+    @type m: int
+    @rtype: list[list[int]]
+
+    >>> _manhattan(2, 2)[0]
+    [0, 1, 1, 2]
+    """
+    if (n, m) not in _MANHATTAN:
+        _MANHATTAN[(n, m)] = [[abs(a // m - b // m) + abs(a % m - b % m)
+                               for b in range(n * m)]
+                              for a in range(n * m)]
+    return _MANHATTAN[(n, m)]
+
+
+def _rank_permutation(perm):
+    """
+    Return the Myrvold-Ruskey rank of perm, a permutation of
+    range(len(perm)), in O(len(perm)) steps.
+
+    @type perm: bytes | list[int]
+    @rtype: int
+
+    >>> [_rank_permutation(p) for p in ([0, 1, 2], [1, 2, 0], [2, 0, 1])]
+    [5, 0, 1]
+    """
+    perm, inverse = list(perm), [0] * len(perm)
+    for i, v in enumerate(perm):
+        inverse[v] = i
+    rank, scale = 0, 1
+    for k in range(len(perm), 1, -1):
+        s, i = perm[k - 1], inverse[k - 1]
+        perm[k - 1], perm[i] = k - 1, s
+        inverse[s], inverse[k - 1] = i, k - 1
+        rank += s * scale
+        scale *= k
+    return rank
+
+
+def _unrank_permutation(rank, size):
+    """
+    Return the permutation of range(size) with Myrvold-Ruskey rank rank.
+
+    @type rank: int
+    @type size: int
+    @rtype: bytes
+
+    >>> list(_unrank_permutation(1, 3))
+    [2, 0, 1]
+    """
+    perm = bytearray(range(size))
+    for k in range(size, 0, -1):
+        rank, r = divmod(rank, k)
+        perm[k - 1], perm[r] = perm[r], perm[k - 1]
+    return bytes(perm)
+
+
+def _neighbours(n, m):
+    """
+    Return, for each row-major position of an nxm grid, the list of
+    positions to its right, left, below and above that are on the grid.
+
+    @type n: int
+    @type m: int
+    @rtype: list[list[int]]
+
+    >>> _neighbours(2, 2)
+    [[1, 2], [0, 3], [3, 0], [2, 1]]
+    """
+    if (n, m) not in _NEIGHBOURS:
+        table = []
+        for i in range(n):
+            for j in range(m):
+                table.append([r * m + c for r, c in
+                              ((i, j + 1), (i, j - 1), (i + 1, j), (i - 1, j))
+                              if 0 <= r < n and 0 <= c < m])
+        _NEIGHBOURS[(n, m)] = table
+    return _NEIGHBOURS[(n, m)]
+
 
 def _extensions_helper_tuple_list(list_tuple):
     """
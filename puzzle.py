@@ -39,3 +39,45 @@ class Puzzle:
         @rtype: list[Puzzle]
         """
         raise NotImplementedError
+
+    def order_extensions(self, extensions):
+        """
+        Return extensions, a list of extensions of Puzzle self, in the
+        order a search should try them.
+
+        Override this in a subclass where some extensions are likelier
+        to lead to a solution than others.
+
+        @type self: Puzzle
+        @type extensions: list[Puzzle]
+        @rtype: list[Puzzle]
+        """
+        return extensions
+
+    def state_key(self):
+        """
+        Return a hashable key identifying the configuration of Puzzle self.
+
+        Puzzles reachable from one another have equal keys iff they are
+        equivalent.  Override this in a subclass with a more compact key.
+
+        @type self: Puzzle
+        @rtype: object
+        """
+        return str(self)
+
+    def key_rank(self, key):
+        """
+        Return a value ranking the configuration with state_key key among
+        others, the least the most promising, for searches that can only
+        keep some configurations.
+
+        This is key_heuristic(key), where a subclass has one.  Override
+        this in a subclass where many configurations share a heuristic
+        value but some are likelier than others to lead to a solution.
+
+        @type self: Puzzle
+        @type key: object
+        @rtype: object
+        """
+        return self.key_heuristic(key)
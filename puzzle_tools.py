@@ -2,7 +2,14 @@
 Some functions for working with puzzles
 """
 from puzzle import Puzzle
+import logging
+from array import array
 from collections import deque
+from heapq import heappush, heappop, nsmallest
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import wait
+from time import time
+from transposition_table import TranspositionTable, MAX_DEPTH
 from word_ladder_puzzle import WordLadderPuzzle
 # set higher recursion limit
 # which is needed in PuzzleNode.__str__
@@ -12,13 +19,28 @@ from word_ladder_puzzle import WordLadderPuzzle
 import sys
 sys.setrecursionlimit(10**6)
 
-def depth_first_solve(puzzle):
+def depth_first_solve(puzzle, budget=None, order=None, table=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
     in its parent.  Return None if this is not possible.
 
+    Extensions are tried in the order extensions builds them, or else in
+    the order returned by order(puzzle, extensions); pass puzzle_order to
+    use each puzzle's own order_extensions.
+
+    Every configuration visited is remembered so that it is searched only
+    once, unless table is given: then only the configurations on the
+    current path and the dead ends table still holds are skipped, so
+    memory stays bounded at the cost of searching forgotten dead ends
+    again.
+
+    Raise BudgetExceeded if budget runs out first.
+
     @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type order: (Puzzle, list[Puzzle]) -> list[Puzzle] | None
+    @type table: TranspositionTable | None
     @rtype: PuzzleNode
 
     >>> word_set = {"b"}
@@ -35,13 +57,63 @@ def depth_first_solve(puzzle):
     c --> c
     <BLANKLINE>
     <BLANKLINE>
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> grid += [[".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> print(depth_first_solve(gpsp, table=TranspositionTable(1)).puzzle)
+    ***
+    ***
+    ***
+    .**
+    _____
     """
+    if table is not None:
+        return _helper_dfs_table(puzzle, puzzle.state_key(), table, set(),
+                                 budget, 0, order)
     seen = set()
-    dfs_node = _helper_dfs(puzzle, seen)
+    dfs_node = _helper_dfs(puzzle, seen, budget, 0, order)
     return dfs_node
 
 
-def _helper_dfs(puzzle, seen):
+def bounded_depth_first_solve(puzzle, budget=None, megabytes=64):
+    """
+    Return depth_first_solve(puzzle, budget), remembering dead ends in a
+    TranspositionTable of megabytes MB.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @type megabytes: float
+    @rtype: PuzzleNode | None
+
+    >>> w = WordLadderPuzzle("a", "c", {"b"})
+    >>> bounded_depth_first_solve(w, megabytes=1) is None
+    True
+    """
+    return depth_first_solve(puzzle, budget,
+                             table=TranspositionTable(megabytes))
+
+
+def puzzle_order(puzzle, extensions):
+    """
+    Return extensions, a list of extensions of puzzle, in the order of
+    puzzle.order_extensions.
+
+    @type puzzle: Puzzle
+    @type extensions: list[Puzzle]
+    @rtype: list[Puzzle]
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [[".", "*", "*", ".", "*", "*", "."]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> print(puzzle_order(gpsp, gpsp.extensions())[0])
+    .***...
+    _____
+    """
+    return puzzle.order_extensions(extensions)
+
+
+def _helper_dfs(puzzle, seen, budget=None, depth=0, order=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child containing an extension of the puzzle
@@ -49,31 +121,84 @@ def _helper_dfs(puzzle, seen):
 
     @type puzzle: Puzzle
     @type seen: set
+    @type budget: SearchBudget | None
+    @type depth: int
+    @type order: (Puzzle, list[Puzzle]) -> list[Puzzle] | None
     @rtype: PuzzleNode | None
     """
+    if budget is not None:
+        budget.charge(puzzle, depth)
     if puzzle.is_solved():
         return PuzzleNode(puzzle)
     elif puzzle.fail_fast():
         return None
     else:
         list_extensions = puzzle.extensions()
+        if order is not None:
+            list_extensions = order(puzzle, list_extensions)
         for x in list_extensions:
             if str(x) not in seen:
                 seen.add(str(x))  # adds to seen
-                node = _helper_dfs(x, seen)
+                node = _helper_dfs(x, seen, budget, depth + 1, order)
                 if node is not None:
                     return PuzzleNode(puzzle, [node])
             # if in seen, then skip to next puzzle config
         return None
 
 
-def breadth_first_solve(puzzle):
+def _helper_dfs_table(puzzle, key, table, path, budget=None, depth=0,
+                      order=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, as _helper_dfs does, skipping extensions whose state_key
+    is in path, the keys of the configurations leading to puzzle, or
+    dead in table, and marking puzzle dead in table if it has no solution.
+
+    puzzle's key must be key.  A configuration that fails only because
+    its way on leads back into path can still be marked dead: the search
+    from that ancestor of it covers its other extensions.
+
+    @type puzzle: Puzzle
+    @type key: Hashable
+    @type table: TranspositionTable
+    @type path: set
+    @type budget: SearchBudget | None
+    @type depth: int
+    @type order: (Puzzle, list[Puzzle]) -> list[Puzzle] | None
+    @rtype: PuzzleNode | None
+    """
+    if budget is not None:
+        budget.charge(puzzle, depth)
+    if puzzle.is_solved():
+        return PuzzleNode(puzzle)
+    elif puzzle.fail_fast():
+        return None
+    list_extensions = puzzle.extensions()
+    if order is not None:
+        list_extensions = order(puzzle, list_extensions)
+    path.add(key)
+    for x in list_extensions:
+        x_key = x.state_key()
+        if x_key not in path and not table.is_dead(x_key):
+            node = _helper_dfs_table(x, x_key, table, path, budget,
+                                     depth + 1, order)
+            if node is not None:
+                return PuzzleNode(puzzle, [node])
+    path.remove(key)
+    table.mark_dead(key, depth)
+    return None
+
+
+def breadth_first_solve(puzzle, budget=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
+    Raise BudgetExceeded if budget runs out first.
+
     @type puzzle: Puzzle
+    @type budget: SearchBudget | None
     @rtype: PuzzleNode | None
 
     >>> word_set = {"b"}
@@ -91,7 +216,7 @@ def breadth_first_solve(puzzle):
     <BLANKLINE>
     <BLANKLINE>
     """
-    bfs = _helper_bfs(puzzle)
+    bfs = _helper_bfs(puzzle, budget)
     if bfs is not None:
         first_node = _helper_bfs_rebuild(bfs)
         return first_node
@@ -115,13 +240,14 @@ def _helper_bfs_rebuild(puzzlenode):
     return node
 
 
-def _helper_bfs(puzzle):
+def _helper_bfs(puzzle, budget=None):
     """
     Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
     a solution, with each child PuzzleNode containing an extension
     of the puzzle in its parent.  Return None if this is not possible.
 
     @type puzzle: Puzzle
+    @type budget: SearchBudget | None
     @rtype: PuzzleNode | None
     """
     queue = deque()
@@ -130,12 +256,14 @@ def _helper_bfs(puzzle):
     first_node = PuzzleNode(puzzle)
     first_node.children = _helper_dfs_extension(puzzle.extensions(),
                                                 first_node)
-    queue.append(first_node)  # append first node to queue
+    queue.append((first_node, 0))  # append first node to queue
     seen.add(str(first_node))  # append first node to seen set
 
     while queue:
-        removed = queue.popleft()  # removed is a PuzzleNode
+        removed, depth = queue.popleft()  # removed is a PuzzleNode
         # with child, and its child has it as a parent
+        if budget is not None:
+            budget.charge(removed.puzzle, depth)
 
         if not removed.puzzle.is_solved():
             if not removed.puzzle.fail_fast():
@@ -146,7 +274,7 @@ def _helper_bfs(puzzle):
                         PN.children = _helper_dfs_extension(
                             PN.puzzle.extensions(), PN)
                         # set child's child to a PuzzleNode
-                        queue.append(PN)
+                        queue.append((PN, depth + 1))
 
         elif removed.puzzle.is_solved():  # if the PuzzleNode is a solution
             return removed
@@ -167,6 +295,682 @@ def _helper_dfs_extension(list_, parent=None):
         list_new.append(PuzzleNode(puzzle, [], parent))
     return list_new
 
+
+def layered_breadth_first_solve(puzzle, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Like breadth_first_solve, but each layer of the search is held as a
+    list of compact state keys and expanded in one pass, so puzzle must
+    implement state_key, from_state_key, key_extensions and key_is_solved,
+    as MNPuzzle and GridPegSolitairePuzzle do.
+
+    Raise BudgetExceeded if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> sol = layered_breadth_first_solve(MNPuzzle(start_grid, target_grid))
+    >>> print(sol)
+    *23
+    145
+    _____
+    <BLANKLINE>
+    123
+    *45
+    _____
+    <BLANKLINE>
+    123
+    4*5
+    _____
+    <BLANKLINE>
+    123
+    45*
+    _____
+    <BLANKLINE>
+    <BLANKLINE>
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> layered_breadth_first_solve(GridPegSolitairePuzzle(grid, {"*", "."}))
+    >>> grid = [["*", ".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> print(layered_breadth_first_solve(gpsp).children[0])
+    **..
+    _____
+    <BLANKLINE>
+    ..*.
+    _____
+    <BLANKLINE>
+    <BLANKLINE>
+    """
+    key = puzzle.state_key()
+    if puzzle.key_is_solved(key):
+        return PuzzleNode(puzzle)
+    # parents maps each key reached to the key it was reached from
+    parents = {key: None}
+    layer = [key]
+    key_extensions, key_is_solved = puzzle.key_extensions, puzzle.key_is_solved
+    depth = 0
+
+    while layer:
+        next_layer = []
+        for key in layer:
+            if budget is not None:
+                try:
+                    budget.charge(key, depth)
+                except BudgetExceeded:
+                    budget.best = puzzle.from_state_key(budget.best)
+                    raise
+            for child in key_extensions(key):
+                if child not in parents:
+                    parents[child] = key
+                    if key_is_solved(child):
+                        return _helper_key_path(puzzle, child, parents)
+                    next_layer.append(child)
+        layer = next_layer
+        depth += 1
+
+    return None
+
+
+def _helper_key_path(puzzle, key, parents, suffix=()):
+    """
+    Return the path of PuzzleNodes from puzzle to the configuration with
+    state_key key, following parents back from key, and on through the
+    configurations with state_keys suffix.
+
+    @type puzzle: Puzzle
+    @type key: object
+    @type parents: dict
+    @type suffix: list
+    @rtype: PuzzleNode
+    """
+    keys = []
+    while parents[key] is not None:
+        keys.append(key)
+        key = parents[key]
+    keys.reverse()
+    keys.extend(suffix)
+    return path_from_list([puzzle] + [puzzle.from_state_key(k) for k in keys])
+
+
+def path_from_list(list_):
+    """
+    Return the first of a chain of PuzzleNodes holding the puzzles in
+    list_, each the only child of the one before it.
+
+    @type list_: list[Puzzle]
+    @rtype: PuzzleNode
+
+    >>> from word_ladder_puzzle import WordLadderPuzzle
+    >>> ws = {"cat", "cot"}
+    >>> print(path_from_list([WordLadderPuzzle("cat", "cot", ws),
+    ...                       WordLadderPuzzle("cot", "cot", ws)]))
+    cat --> cot
+    <BLANKLINE>
+    cot --> cot
+    <BLANKLINE>
+    <BLANKLINE>
+    """
+    node = PuzzleNode(list_[-1])
+    for puzzle in reversed(list_[:-1]):
+        node.parent = PuzzleNode(puzzle, [node])
+        node = node.parent
+    return node
+
+
+def list_from_path(node):
+    """
+    Return the puzzles held by the chain of PuzzleNodes starting at node,
+    each the first child of the one before it, so that long paths can be
+    pickled without deep recursion.
+
+    @type node: PuzzleNode
+    @rtype: list[Puzzle]
+
+    >>> list_from_path(path_from_list(["a", "b", "c"]))
+    ['a', 'b', 'c']
+    """
+    list_ = []
+    while node is not None:
+        list_.append(node.puzzle)
+        node = node.children[0] if node.children else None
+    return list_
+
+
+def ranked_breadth_first_solve(puzzle, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Like layered_breadth_first_solve, but states are identified by a dense
+    rank, as MNPuzzle provides with rank_count, rank_of_key and
+    key_of_rank.  Visited states are marked in a bytearray of
+    rank_count() bytes and layers are stored as arrays of ranks, so
+    memory is flat instead of growing with a set of keys.  Every move of
+    puzzle must be reversible.
+
+    Raise BudgetExceeded if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle(start_grid, target_grid)
+    >>> ranked_breadth_first_solve(m) == layered_breadth_first_solve(m)
+    True
+    >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+    >>> ranked_breadth_first_solve(MNPuzzle(start_grid, target_grid))
+    """
+    key = puzzle.state_key()
+    if puzzle.key_is_solved(key):
+        return PuzzleNode(puzzle)
+    key_extensions, key_is_solved = puzzle.key_extensions, puzzle.key_is_solved
+    rank_of_key, key_of_rank = puzzle.rank_of_key, puzzle.key_of_rank
+    # mark[r] is 0 if rank r is unvisited, or else 1 + its depth mod 3,
+    # which tells apart the layers before, at and after any visited rank
+    mark = bytearray(puzzle.rank_count())
+    typecode = "I" if len(mark) <= 2 ** 32 else "Q"
+    rank = rank_of_key(key)
+    mark[rank] = 1
+    layer, depth = array(typecode, [rank]), 0
+
+    while layer:
+        next_layer, next_mark = array(typecode), 1 + (depth + 1) % 3
+        for rank in layer:
+            key = key_of_rank(rank)
+            if budget is not None:
+                try:
+                    budget.charge(key, depth)
+                except BudgetExceeded:
+                    budget.best = puzzle.from_state_key(budget.best)
+                    raise
+            for child in key_extensions(key):
+                child_rank = rank_of_key(child)
+                if not mark[child_rank]:
+                    mark[child_rank] = next_mark
+                    if key_is_solved(child):
+                        return _helper_rank_path(puzzle, child, depth + 1,
+                                                 mark)
+                    next_layer.append(child_rank)
+        layer, depth = next_layer, depth + 1
+
+    return None
+
+
+def _helper_rank_path(puzzle, key, depth, mark):
+    """
+    Return the path of PuzzleNodes from puzzle to the configuration with
+    state_key key at depth, stepping back through the extensions that mark
+    places one layer earlier.
+
+    @type puzzle: Puzzle
+    @type key: object
+    @type depth: int
+    @type mark: bytearray
+    @rtype: PuzzleNode
+    """
+    keys = [key]
+    for d in range(depth - 1, 0, -1):
+        key = next(k for k in puzzle.key_extensions(key)
+                   if mark[puzzle.rank_of_key(k)] == 1 + d % 3)
+        keys.append(key)
+    keys.reverse()
+    return path_from_list([puzzle] + [puzzle.from_state_key(k) for k in keys])
+
+
+def weighted_astar_solve(puzzle, weight=2.0, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if this is not possible.
+
+    Configurations are expanded in order of moves made plus weight times
+    puzzle.key_heuristic, over compact state keys as in
+    layered_breadth_first_solve.  With an admissible heuristic, such as
+    MNPuzzle's, the path is at most weight times longer than a shortest
+    one; larger weights expand fewer configurations.  Memory grows with
+    the configurations reached, so bound it with budget's max_nodes.
+
+    Raise BudgetExceeded if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type weight: float
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle(start_grid, target_grid)
+    >>> weighted_astar_solve(m, 1) == breadth_first_solve(m)
+    True
+    >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+    >>> weighted_astar_solve(MNPuzzle(start_grid, target_grid))
+    """
+    key = puzzle.state_key()
+    key_extensions, key_is_solved = puzzle.key_extensions, puzzle.key_is_solved
+    key_heuristic = puzzle.key_heuristic
+    # parents and moves map each key reached to the key it was best
+    # reached from and the number of moves that took; the counter in heap
+    # entries breaks ties first in, first out
+    parents, moves = {key: None}, {key: 0}
+    heap, counter = [(weight * key_heuristic(key), 0, key)], 1
+
+    while heap:
+        f, _, key = heappop(heap)
+        g = moves[key]
+        if f > g + weight * key_heuristic(key):
+            continue  # a stale entry, superseded by a shorter route
+        if key_is_solved(key):
+            return _helper_key_path(puzzle, key, parents)
+        if budget is not None:
+            try:
+                budget.charge(key, g)
+            except BudgetExceeded:
+                budget.best = puzzle.from_state_key(budget.best)
+                raise
+        for child in key_extensions(key):
+            if child not in moves or g + 1 < moves[child]:
+                parents[child], moves[child] = key, g + 1
+                heappush(heap, (g + 1 + weight * key_heuristic(child),
+                                counter, child))
+                counter += 1
+
+    return None
+
+
+def beam_search_solve(puzzle, width=100, budget=None):
+    """
+    Return a path from PuzzleNode(puzzle) to a PuzzleNode containing
+    a solution, with each child PuzzleNode containing an extension
+    of the puzzle in its parent.  Return None if there is none.
+
+    Like layered_breadth_first_solve, but only the width configurations
+    of each layer with the least puzzle.key_rank are expanded and kept,
+    so each layer costs at most width expansions and memory grows by at
+    most width keys per layer.  Configurations left out may be reached
+    again later.  Wider beams find shorter paths, and fail less often, at
+    the cost of speed.
+
+    Raise BudgetExceeded if budget runs out first, or if no solution is
+    found after configurations were left out of the beam, which does not
+    show that there is none.
+
+    @type puzzle: Puzzle
+    @type width: int
+    @type budget: SearchBudget | None
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle(start_grid, target_grid)
+    >>> beam_search_solve(m, 1) == breadth_first_solve(m)
+    True
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> gpsp = GridPegSolitairePuzzle([["*", "*", ".", "*", "*"]], {"*", "."})
+    >>> beam_search_solve(gpsp, 1)
+    Traceback (most recent call last):
+    ...
+    puzzle_tools.BudgetExceeded: beam of width 1 found no solution
+    >>> print(beam_search_solve(gpsp, 2) is None)
+    True
+    """
+    key = puzzle.state_key()
+    if puzzle.key_is_solved(key):
+        return PuzzleNode(puzzle)
+    key_extensions, key_is_solved = puzzle.key_extensions, puzzle.key_is_solved
+    key_rank = puzzle.key_rank
+    # parents maps each key kept in the beam to the key it was reached
+    # from, and candidates each new key of the next layer likewise, so
+    # that only the keys kept outlive their layer
+    parents = {key: None}
+    layer, depth, pruned = [key], 0, False
+
+    while layer:
+        candidates = {}
+        for key in layer:
+            if budget is not None:
+                try:
+                    budget.charge(key, depth)
+                except BudgetExceeded:
+                    budget.best = puzzle.from_state_key(budget.best)
+                    raise
+            for child in key_extensions(key):
+                if child not in parents and child not in candidates:
+                    candidates[child] = key
+                    if key_is_solved(child):
+                        parents[child] = key
+                        return _helper_key_path(puzzle, child, parents)
+        pruned = pruned or len(candidates) > width
+        layer = nsmallest(width, candidates, key=key_rank)
+        for child in layer:
+            parents[child] = candidates[child]
+        depth += 1
+
+    if pruned:
+        if budget is not None:
+            budget.best = puzzle.from_state_key(budget.best)
+        raise BudgetExceeded("beam of width {} found no solution".format(
+            width))
+    return None
+
+
+def hybrid_solve(puzzle, max_states=1000000, budget=None, megabytes=64):
+    """
+    Return a shortest path from PuzzleNode(puzzle) to a PuzzleNode
+    containing a solution, with each child PuzzleNode containing an
+    extension of the puzzle in its parent.  Return None if this is not
+    possible.
+
+    The search is layered_breadth_first_solve's until it has reached
+    max_states configurations.  It then forgets the layer it was building
+    and runs iterative deepening from each configuration of the last full
+    layer, so memory stays near max_states configurations and a
+    TranspositionTable of megabytes MB, cutting off configurations that
+    puzzle.key_heuristic, which must never overestimate the moves left,
+    shows cannot be solved within the limit.  Every shortest path passes
+    through that layer, and never back into the configurations reached
+    before it, so the path found is still a shortest one.  puzzle must
+    implement the compact key methods.
+
+    The table records how many moves each configuration searched has
+    been shown to have no solution within, unlimited if nothing below it
+    was cut off, so the deepening does not search it again to no more
+    moves.  Once an iteration reaches no configuration that none before
+    it searched, every configuration beyond the layer has been searched,
+    and there is no solution.  The table forgets configurations that
+    collide in it, however large, and those are reached anew in every
+    iteration, so an unsolvable puzzle may never be shown so: budget must
+    set a deadline, a node limit or a token, and ValueError is raised if
+    it sets none.
+
+    Raise BudgetExceeded if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type max_states: int
+    @type budget: SearchBudget | None
+    @type megabytes: float
+    @rtype: PuzzleNode | None
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("5", "4", "3"), ("2", "1", "*"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle(start_grid, target_grid)
+    >>> sol = hybrid_solve(m, 20, SearchBudget(max_nodes=10000))
+    >>> sol == layered_breadth_first_solve(m)
+    True
+    >>> hybrid_solve(m, 20)
+    Traceback (most recent call last):
+    ...
+    ValueError: hybrid_solve needs a budget with a limit
+    >>> start_grid = (("2", "1", "3"), ("4", "5", "*"))
+    >>> hybrid_solve(MNPuzzle(start_grid, target_grid), 1000,
+    ...              SearchBudget(max_nodes=10000))
+    >>> from functools import partial
+    >>> result = anytime_solve(MNPuzzle(start_grid, target_grid),
+    ...                        partial(hybrid_solve, max_states=20),
+    ...                        max_nodes=1000)
+    >>> result.status, result.nodes
+    ('budget-exceeded', 1001)
+    """
+    if budget is None or (budget.deadline is None and
+                          budget.max_nodes is None and budget.token is None):
+        raise ValueError("hybrid_solve needs a budget with a limit")
+    key = puzzle.state_key()
+    if puzzle.key_is_solved(key):
+        return PuzzleNode(puzzle)
+    # parents maps each key reached to the key it was reached from
+    parents = {key: None}
+    layer = [key]
+    key_extensions, key_is_solved = puzzle.key_extensions, puzzle.key_is_solved
+    depth = 0
+
+    try:
+        while layer:
+            next_layer = []
+            for key in layer:
+                budget.charge(key, depth)
+                for child in key_extensions(key):
+                    if child not in parents:
+                        parents[child] = key
+                        if key_is_solved(child):
+                            return _helper_key_path(puzzle, child, parents)
+                        next_layer.append(child)
+                if len(parents) > max_states:
+                    break
+            else:
+                layer = next_layer
+                depth += 1
+                continue
+            # out of room: keep only the configurations up to layer, each
+            # already reached by a shortest path
+            for child in next_layer:
+                del parents[child]
+            next_layer = None
+            table, limit = TranspositionTable(megabytes), 1
+            while True:
+                # fresh[0] counts configurations reached in this iteration
+                # that no earlier search expanded
+                cut_off, fresh = False, [0]
+                for key in layer:
+                    if table.depth(key) is None:
+                        fresh[0] += 1
+                    if puzzle.key_heuristic(key) > limit:
+                        cut_off = True
+                        continue
+                    found = _helper_iddfs(puzzle, key, limit, parents, {key},
+                                          table, fresh, budget, depth)
+                    if found is True:
+                        cut_off = True
+                    elif found is not None:
+                        return _helper_key_path(puzzle, key, parents, found)
+                if not cut_off or not fresh[0]:
+                    return None
+                limit += 1
+    except BudgetExceeded:
+        budget.best = puzzle.from_state_key(budget.best)
+        raise
+
+    return None
+
+
+def _helper_iddfs(puzzle, key, limit, closed, path, table, fresh, budget=None,
+                  depth=0):
+    """
+    Return the state_keys of a path of at most limit moves from the
+    configuration of puzzle with state_key key to a solution, without key
+    itself, avoiding the keys in closed other than key and the keys in
+    path, those of the configurations leading to key.  Return True if
+    there is none but the limit, or puzzle.key_heuristic, cut the search
+    short, and None otherwise.
+
+    A configuration searched without a solution is recorded in table at
+    depth MAX_DEPTH less the moves it was searched to, or at depth 0 if
+    nothing was cut short, and is not searched again to no more moves.
+    fresh[0] is increased by the number of configurations reached that
+    table does not hold.
+
+    @type puzzle: Puzzle
+    @type key: object
+    @type limit: int
+    @type closed: dict
+    @type path: set
+    @type table: TranspositionTable
+    @type fresh: list[int]
+    @type budget: SearchBudget | None
+    @type depth: int
+    @rtype: list | bool | None
+    """
+    if budget is not None:
+        budget.charge(key, depth)
+    cut_off = False
+    for child in puzzle.key_extensions(key):
+        if child in closed or child in path:
+            continue
+        if puzzle.key_is_solved(child):
+            return [child]
+        searched = table.depth(child)
+        if searched is None:
+            fresh[0] += 1
+        elif searched == 0:
+            continue  # no solution below it at all
+        if limit == 1 or puzzle.key_heuristic(child) > limit - 1:
+            cut_off = True
+            continue
+        if searched is not None and MAX_DEPTH - searched >= limit - 1:
+            cut_off = True  # no solution within limit - 1 moves
+            continue
+        path.add(child)
+        found = _helper_iddfs(puzzle, child, limit - 1, closed, path, table,
+                              fresh, budget, depth + 1)
+        path.remove(child)
+        if found is True:
+            cut_off = True
+        elif found is not None:
+            return [child] + found
+    table.mark_dead(key, max(MAX_DEPTH - limit, 1) if cut_off else 0)
+    return True if cut_off else None
+
+
+def count_solutions(puzzle, budget=None):
+    """
+    Return the number of paths from puzzle to a solution, each step being
+    to an extension and each path ending at its first solved puzzle.
+
+    Counts are remembered by state_key, so every configuration is
+    expanded once however many paths reach it.  Raise ValueError if a
+    configuration can be reached from itself, as the paths through it
+    would then have no end, and BudgetExceeded if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @rtype: int
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> grid += [[".", "*", "*"]]
+    >>> count_solutions(GridPegSolitairePuzzle(grid, {"*", "."}))
+    852
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> count_solutions(SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"}))
+    288
+    >>> count_solutions(WordLadderPuzzle("cat", "dog", {"cat", "cot"}))
+    0
+    >>> count_solutions(WordLadderPuzzle("cat", "dog", {"cat", "cot", "dog"}))
+    Traceback (most recent call last):
+    ...
+    ValueError: configuration cat --> dog repeats along a path
+    """
+    return _helper_count(puzzle, puzzle.state_key(), {}, set(), budget, 0)
+
+
+def _helper_count(puzzle, key, counts, path, budget=None, depth=0):
+    """
+    Return the number of paths from puzzle, whose state_key is key, to a
+    solution, recording it and those of the configurations it leads to in
+    counts.  path holds the keys of the configurations leading to puzzle.
+
+    @type puzzle: Puzzle
+    @type key: Hashable
+    @type counts: dict
+    @type path: set
+    @type budget: SearchBudget | None
+    @type depth: int
+    @rtype: int
+    """
+    if key in counts:
+        return counts[key]
+    if budget is not None:
+        budget.charge(puzzle, depth)
+    if puzzle.is_solved():
+        count = 1
+    elif puzzle.fail_fast():
+        count = 0
+    else:
+        path.add(key)
+        count = 0
+        for x in puzzle.extensions():
+            x_key = x.state_key()
+            if x_key in path:
+                raise ValueError(
+                    "configuration {} repeats along a path".format(x))
+            count += _helper_count(x, x_key, counts, path, budget, depth + 1)
+        path.remove(key)
+    counts[key] = count
+    return count
+
+
+def iter_solutions(puzzle, budget=None):
+    """
+    Yield, one at a time, each path from PuzzleNode(puzzle) to a
+    PuzzleNode containing a solution that passes through no configuration
+    twice, each step being to an extension and each path ending at its
+    first solved puzzle.
+
+    Configurations from which no path to a solution was found are
+    remembered by state_key and not searched again.  Raise BudgetExceeded
+    if budget runs out first.
+
+    @type puzzle: Puzzle
+    @type budget: SearchBudget | None
+    @rtype: Iterator[PuzzleNode]
+
+    >>> ws = {"cat", "cot", "cog", "dot", "dog"}
+    >>> paths = iter_solutions(WordLadderPuzzle("cat", "dog", ws))
+    >>> [str(path.children[0].children[0].puzzle) for path in paths]
+    ['cog --> dog', 'dot --> dog']
+    """
+    if budget is not None:
+        budget.charge(puzzle, 0)
+    if puzzle.is_solved():
+        yield PuzzleNode(puzzle)
+        return
+    elif puzzle.fail_fast():
+        return
+    key = puzzle.state_key()
+    path, dead = {key}, set()
+    # a frame per configuration on the path: the puzzle, its key, its
+    # extensions yet to try, whether a solution was found through it, and
+    # whether a way on was blocked by the path, in which case it may lead
+    # to solutions along other paths and must not be marked dead
+    stack = [[puzzle, key, iter(puzzle.extensions()), False, False]]
+    while stack:
+        frame = stack[-1]
+        x = next(frame[2], None)
+        if x is None:
+            stack.pop()
+            path.remove(frame[1])
+            if not frame[3] and not frame[4]:
+                dead.add(frame[1])
+            if stack:
+                stack[-1][3] |= frame[3]
+                stack[-1][4] |= frame[4]
+            continue
+        x_key = x.state_key()
+        if x_key in path:
+            frame[4] = True
+        elif x_key not in dead:
+            if budget is not None:
+                budget.charge(x, len(stack))
+            if x.is_solved():
+                frame[3] = True
+                yield path_from_list([f[0] for f in stack] + [x])
+            elif not x.fail_fast():
+                path.add(x_key)
+                stack.append([x, x_key, iter(x.extensions()), False, False])
+
 # Class PuzzleNode helps build trees of PuzzleNodes that have
 # an arbitrary number of children, and a parent.
 
@@ -223,3 +1027,306 @@ class PuzzleNode:
         """
         return "{}\n\n{}".format(self.puzzle,
                                  "\n".join([str(x) for x in self.children]))
+
+
+# Budgets let callers bound how long a solver may run.  Solvers charge
+# their SearchBudget once per node expanded and abandon the search by
+# raising BudgetExceeded; anytime_solve turns the outcome into a
+# SolveResult.
+
+SOLVED, UNSOLVABLE, BUDGET_EXCEEDED = "solved", "unsolvable", "budget-exceeded"
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by a solver whose SearchBudget has run out.
+    """
+    pass
+
+
+class SearchBudget:
+    """
+    Limits on a search: a deadline, a number of nodes to expand, and a
+    cancellation token, along with the progress made against them.
+    """
+
+    def __init__(self, deadline=None, max_nodes=None, token=None):
+        """
+        Create a new SearchBudget self.
+
+        deadline is an absolute time as returned by time.time(), and token
+        is any object whose is_set() becomes True to cancel the search,
+        such as a threading.Event.  A limit of None is never reached.
+
+        @type self: SearchBudget
+        @type deadline: float | None
+        @type max_nodes: int | None
+        @type token: threading.Event | None
+        @rtype: None
+        """
+        self.deadline, self.max_nodes, self.token = deadline, max_nodes, token
+        # nodes expanded so far, and the deepest configuration reached
+        self.nodes, self.best, self.best_depth = 0, None, -1
+
+    def charge(self, puzzle, depth):
+        """
+        Record the expansion of puzzle at depth, and raise BudgetExceeded
+        if SearchBudget self has run out.
+
+        @type self: SearchBudget
+        @type puzzle: Puzzle | object
+        @type depth: int
+        @rtype: None
+
+        >>> b = SearchBudget(max_nodes=1)
+        >>> b.charge("a", 0)
+        >>> b.charge("b", 1)
+        Traceback (most recent call last):
+        ...
+        puzzle_tools.BudgetExceeded: node budget of 1 exhausted
+        >>> b.best
+        'b'
+        """
+        self.nodes += 1
+        if depth > self.best_depth:
+            self.best, self.best_depth = puzzle, depth
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded(
+                "node budget of {} exhausted".format(self.max_nodes))
+        if self.deadline is not None and time() > self.deadline:
+            raise BudgetExceeded("deadline passed")
+        if self.token is not None and self.token.is_set():
+            raise BudgetExceeded("cancelled")
+
+
+class SolveResult:
+    """
+    The outcome of anytime_solve: a status of SOLVED, UNSOLVABLE or
+    BUDGET_EXCEEDED, the solution path if any, and search statistics.
+    """
+
+    def __init__(self, status, solution=None, nodes=0, seconds=0.0,
+                 best=None, reason=None):
+        """
+        Create a new SolveResult self.
+
+        @type self: SolveResult
+        @type status: str
+        @type solution: PuzzleNode | None
+        @type nodes: int
+        @type seconds: float
+        @type best: Puzzle | None
+        @type reason: str | None
+        @rtype: None
+        """
+        self.status, self.solution = status, solution
+        self.nodes, self.seconds = nodes, seconds
+        # deepest configuration reached, and why the search stopped early
+        self.best, self.reason = best, reason
+
+    def __str__(self):
+        """
+        Return a human-readable string representing SolveResult self.
+
+        @type self: SolveResult
+        @rtype: str
+
+        >>> print(SolveResult(UNSOLVABLE, nodes=3, seconds=0.5))
+        unsolvable after 3 nodes in 0.5 seconds
+        """
+        return "{}{} after {} nodes in {} seconds".format(
+            self.status, "" if self.reason is None else
+            " ({})".format(self.reason), self.nodes, self.seconds)
+
+
+def anytime_solve(puzzle, solver=depth_first_solve, deadline=None,
+                  max_nodes=None, token=None):
+    """
+    Return a SolveResult from running solver on puzzle until it finishes,
+    expands max_nodes nodes, passes deadline, or token is set.
+
+    solver is any solver from this module that takes a budget.
+
+    @type puzzle: Puzzle
+    @type solver: (Puzzle, SearchBudget) -> PuzzleNode | None
+    @type deadline: float | None
+    @type max_nodes: int | None
+    @type token: threading.Event | None
+    @rtype: SolveResult
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> grid += [[".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> anytime_solve(gpsp).status
+    'solved'
+    >>> result = anytime_solve(gpsp, breadth_first_solve, max_nodes=5)
+    >>> result.status, result.reason, result.nodes
+    ('budget-exceeded', 'node budget of 5 exhausted', 6)
+    >>> print(result.best)
+    ***
+    *.*
+    *.*
+    **.
+    _____
+    >>> from threading import Event
+    >>> token = Event()
+    >>> token.set()
+    >>> anytime_solve(gpsp, token=token).reason
+    'cancelled'
+    >>> anytime_solve(GridPegSolitairePuzzle([["*", "*"]], {"*"})).status
+    'unsolvable'
+    """
+    budget = SearchBudget(deadline, max_nodes, token)
+    start = time()
+    try:
+        solution = solver(puzzle, budget=budget)
+    except BudgetExceeded as e:
+        return SolveResult(BUDGET_EXCEEDED, None, budget.nodes, time() - start,
+                           budget.best, str(e))
+    return SolveResult(SOLVED if solution is not None else UNSOLVABLE,
+                       solution, budget.nodes, time() - start, budget.best)
+
+
+# seconds to wait past a deadline for strategies to report
+_GRACE = 1.0
+logger = logging.getLogger(__name__)
+
+
+def portfolio_solve(puzzle, strategies=("dfs", "bfs"), deadline=None,
+                    max_nodes=None):
+    """
+    Return the name of the first of strategies, names in SOLVERS, to solve
+    puzzle or show it unsolvable, and its SolveResult.
+
+    Each strategy runs in a process of its own under anytime_solve with
+    deadline and max_nodes, and the rest are killed once one finishes.
+    A process that exits without reporting, killed for running out of
+    memory for instance, reports BUDGET_EXCEEDED with its exit code as
+    reason.  If none finishes, return the first to report and its
+    SolveResult, or None and a SolveResult of BUDGET_EXCEEDED if none
+    reports in time.
+    The outcome is logged, to help choose strategies for each kind of
+    puzzle.
+
+    @type puzzle: Puzzle
+    @type strategies: tuple[str]
+    @type deadline: float | None
+    @type max_nodes: int | None
+    @rtype: (str | None, SolveResult)
+
+    >>> from grid_peg_solitaire_puzzle import GridPegSolitairePuzzle
+    >>> grid = [["*", "*", "*"], ["*", "*", "*"], ["*", "*", "*"]]
+    >>> grid += [[".", "*", "*"]]
+    >>> gpsp = GridPegSolitairePuzzle(grid, {"*", "."})
+    >>> strategy, result = portfolio_solve(gpsp, ("dfs", "bfs"), time() + 10)
+    >>> strategy in ("dfs", "bfs"), result.status
+    (True, 'solved')
+    >>> len(list_from_path(result.solution))
+    11
+    >>> portfolio_solve(gpsp, ("beam", "dfs"), max_nodes=5)[1].status
+    'budget-exceeded'
+    >>> result = portfolio_solve(gpsp, ("ranked-bfs",))[1]
+    >>> result.status, result.reason.split(":")[0]
+    ('budget-exceeded', 'AttributeError')
+    """
+    for strategy in strategies:
+        if strategy not in SOLVERS:
+            raise ValueError("unknown strategy {!r}".format(strategy))
+    start = time()
+    # pending maps the end of each running strategy's pipe we read from
+    # to the strategy and its process
+    pending, processes = {}, []
+    first = None
+    try:
+        for strategy in strategies:
+            reader, writer = Pipe(duplex=False)
+            process = Process(target=_portfolio_job, daemon=True,
+                              args=(puzzle, strategy, deadline, max_nodes,
+                                    writer))
+            process.start()
+            writer.close()
+            pending[reader] = strategy, process
+            processes.append(process)
+        while pending:
+            sentinels = {process.sentinel: reader
+                         for reader, (_, process) in pending.items()}
+            ready = wait(list(pending) + list(sentinels),
+                         None if deadline is None else
+                         max(0.0, deadline + _GRACE - time()))
+            if not ready:
+                break
+            for reader in {sentinels.get(r, r) for r in ready}:
+                strategy, process = pending.pop(reader)
+                try:
+                    result = reader.recv()
+                except EOFError:
+                    process.join()
+                    result = SolveResult(
+                        BUDGET_EXCEEDED, seconds=time() - start,
+                        reason="exited with code {} without reporting".format(
+                            process.exitcode))
+                reader.close()
+                if first is None or result.status in (SOLVED, UNSOLVABLE):
+                    first = strategy, result
+            if first[1].status in (SOLVED, UNSOLVABLE):
+                break
+    finally:
+        for reader in pending:
+            reader.close()
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    if first is None:
+        first = None, SolveResult(BUDGET_EXCEEDED, seconds=time() - start,
+                                  reason="no strategy reported in time")
+    strategy, result = first
+    if result.solution is not None:
+        result.solution = path_from_list(result.solution)
+    logger.info("portfolio %s on %s: %s %s after %.3f seconds",
+                "/".join(strategies), type(puzzle).__name__,
+                strategy, result.status, time() - start)
+    return first
+
+
+def _portfolio_job(puzzle, strategy, deadline, max_nodes, results):
+    """
+    Send the SolveResult of solving puzzle with strategy by deadline in
+    max_nodes nodes, its solution flattened by list_from_path, through the
+    connection results.
+
+    A strategy that raises an exception, such as one the puzzle lacks the
+    methods for, reports BUDGET_EXCEEDED with the exception as reason, so
+    that portfolio_solve does not wait for it forever.
+
+    @type puzzle: Puzzle
+    @type strategy: str
+    @type deadline: float | None
+    @type max_nodes: int | None
+    @type results: multiprocessing.connection.Connection
+    @rtype: None
+    """
+    start = time()
+    try:
+        result = anytime_solve(puzzle, SOLVERS[strategy], deadline, max_nodes)
+    except Exception as e:
+        result = SolveResult(BUDGET_EXCEEDED, seconds=time() - start,
+                             reason="{}: {}".format(type(e).__name__, e))
+    if result.solution is not None:
+        result.solution = list_from_path(result.solution)
+    results.send(result)
+
+
+# solvers by the strategy names callers such as solver_service use
+SOLVERS = {"dfs": depth_first_solve,
+           "bounded-dfs": bounded_depth_first_solve,
+           "bfs": breadth_first_solve,
+           "layered-bfs": layered_breadth_first_solve,
+           "ranked-bfs": ranked_breadth_first_solve,
+           "weighted-astar": weighted_astar_solve,
+           "beam": beam_search_solve,
+           "hybrid": hybrid_solve}
+# strategies that may give up, with BUDGET_EXCEEDED, on puzzles they were
+# given time enough to solve
+INCOMPLETE_STRATEGIES = {"beam"}
@@ -0,0 +1,195 @@
+"""
+An asyncio front end that runs the puzzle_tools solvers in a process pool
+"""
+import asyncio
+import os
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from time import time
+from puzzle_tools import (SOLVERS, BUDGET_EXCEEDED, SolveResult,
+                          anytime_solve, path_from_list, list_from_path)
+
+# seconds to wait past a job's deadline before giving up on its worker
+_GRACE = 1.0
+
+
+class SolverService:
+    """
+    A pool of worker processes that solves puzzles for coroutines.
+
+    At most max_concurrency jobs run at once in each event loop that uses
+    it, and concurrent requests to solve equal puzzles with the same
+    strategy share one job.
+    """
+
+    def __init__(self, max_workers=None, max_concurrency=None, timeout=None):
+        """
+        Create a new SolverService self with max_workers processes,
+        running at most max_concurrency jobs at once, each given timeout
+        seconds unless solve says otherwise.
+
+        @type self: SolverService
+        @type max_workers: int | None
+        @type max_concurrency: int | None
+        @type timeout: float | None
+        @rtype: None
+        """
+        max_workers = max_workers or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers)
+        self.max_concurrency = max_concurrency or max_workers
+        self.timeout = timeout
+        # event loop -> (semaphore, in_flight) for the jobs started in it,
+        # where in_flight maps (strategy, puzzle) to the task solving it;
+        # asyncio objects belong to one loop, and the service may outlive
+        # the loop that first used it
+        self._loops = weakref.WeakKeyDictionary()
+
+    async def solve(self, puzzle, strategy="dfs", timeout=None):
+        """
+        Return a SolveResult from solving puzzle with the solver named
+        strategy in puzzle_tools.SOLVERS, giving up after timeout seconds.
+
+        A request that joins a job already in flight gets that job's
+        result, whatever timeout it asked for.
+
+        @type self: SolverService
+        @type puzzle: Puzzle
+        @type strategy: str
+        @type timeout: float | None
+        @rtype: SolveResult
+        """
+        if strategy not in SOLVERS:
+            raise ValueError("unknown strategy {!r}".format(strategy))
+        semaphore, in_flight = self._loop_state()
+        key = (strategy, puzzle)
+        if key not in in_flight:
+            if timeout is None:
+                timeout = self.timeout
+            task = asyncio.ensure_future(
+                self._run(puzzle, strategy, timeout, semaphore))
+            in_flight[key] = task
+            task.add_done_callback(lambda _: in_flight.pop(key, None))
+        return await asyncio.shield(in_flight[key])
+
+    def _loop_state(self):
+        """
+        Return the semaphore and the jobs in flight of SolverService self
+        for the running event loop.
+
+        @type self: SolverService
+        @rtype: (asyncio.Semaphore, dict)
+        """
+        loop = asyncio.get_running_loop()
+        if loop not in self._loops:
+            self._loops[loop] = (asyncio.Semaphore(self.max_concurrency), {})
+        return self._loops[loop]
+
+    async def _run(self, puzzle, strategy, timeout, semaphore):
+        """
+        Return a SolveResult from solving puzzle with strategy in a
+        worker process, giving up after timeout seconds.
+
+        The job holds a slot of semaphore until its worker is done with
+        it, even if it is given up on before then.
+
+        @type self: SolverService
+        @type puzzle: Puzzle
+        @type strategy: str
+        @type timeout: float | None
+        @type semaphore: asyncio.Semaphore
+        @rtype: SolveResult
+        """
+        await semaphore.acquire()
+        start = time()
+        deadline = None if timeout is None else start + timeout
+        try:
+            job = asyncio.get_running_loop().run_in_executor(
+                self._executor, _solve_job, puzzle, strategy, deadline)
+        except BaseException:
+            semaphore.release()
+            raise
+        job.add_done_callback(lambda _: semaphore.release())
+        try:
+            # shielded, so that giving up does not cancel job and free its
+            # slot while the worker is still busy with it
+            result = await asyncio.wait_for(
+                asyncio.shield(job),
+                None if timeout is None else timeout + _GRACE)
+        except asyncio.TimeoutError:
+            return SolveResult(BUDGET_EXCEEDED, seconds=time() - start,
+                               reason="timed out")
+        if result.solution is not None:
+            result.solution = path_from_list(result.solution)
+        return result
+
+    def close(self):
+        """
+        Shut down the worker processes of SolverService self.
+
+        @type self: SolverService
+        @rtype: None
+        """
+        self._executor.shutdown(cancel_futures=True)
+
+
+def _solve_job(puzzle, strategy, deadline):
+    """
+    Return a SolveResult from solving puzzle with strategy by deadline,
+    with its solution flattened by list_from_path.
+
+    @type puzzle: Puzzle
+    @type strategy: str
+    @type deadline: float | None
+    @rtype: SolveResult
+    """
+    result = anytime_solve(puzzle, SOLVERS[strategy], deadline)
+    if result.solution is not None:
+        result.solution = list_from_path(result.solution)
+    return result
+
+
+_service = None
+
+
+async def solve_async(puzzle, strategy="dfs", timeout=None):
+    """
+    Return a SolveResult from solving puzzle with the solver named
+    strategy, in a SolverService shared by the whole program.
+
+    @type puzzle: Puzzle
+    @type strategy: str
+    @type timeout: float | None
+    @rtype: SolveResult
+
+    >>> from mn_puzzle import MNPuzzle
+    >>> start_grid = (("*", "2", "3"), ("1", "4", "5"))
+    >>> target_grid = (("1", "2", "3"), ("4", "5", "*"))
+    >>> m = MNPuzzle(start_grid, target_grid)
+    >>> async def solve_twice():
+    ...     return await asyncio.gather(solve_async(m, "bfs"),
+    ...                                 solve_async(m, "bfs"))
+    >>> first, second = asyncio.run(solve_twice())
+    >>> first is second, first.status
+    (True, 'solved')
+    >>> print(first.solution.children[0].children[0].puzzle)
+    123
+    4*5
+    _____
+    >>> shutdown()
+    """
+    global _service
+    if _service is None:
+        _service = SolverService()
+    return await _service.solve(puzzle, strategy, timeout)
+
+
+def shutdown():
+    """
+    Shut down the SolverService used by solve_async, if any.
+
+    @rtype: None
+    """
+    global _service
+    if _service is not None:
+        _service.close()
+        _service = None
@@ -0,0 +1,240 @@
+"""
+Solve many sudoku grids at once by bit-sliced constraint propagation
+
+Rather than a candidate mask per cell of one grid, as in sudoku_masks, a
+batch of K grids keeps a K-bit int per cell and symbol: bit k is set iff
+the cell of grid k may still hold the symbol.  Each & or | of these ints
+then acts on the whole batch, so propagation costs about as many Python
+operations for K grids as for one.  Only the grids that propagation
+neither fills nor refutes are searched one at a time.
+"""
+from sudoku_masks import tables, search, to_values
+
+
+def solve_batch(grids, n=9):
+    """
+    Return a solution of each of grids, nxn grids given as lists of
+    values as returned by SudokuPuzzle.values, as a list of values, or
+    None for a grid with no solution.
+
+    @type grids: list[list[int]]
+    @type n: int
+    @rtype: list[list[int] | None]
+
+    >>> grids = [[1, 0, 0, 0, 0, 0, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0],
+    ...          [1, 1] + [0] * 14,
+    ...          [0] * 16]
+    >>> for solution in solve_batch(grids, 4):
+    ...     print(solution)
+    [1, 2, 3, 4, 3, 4, 1, 2, 2, 1, 4, 3, 4, 3, 2, 1]
+    None
+    [1, 2, 3, 4, 3, 4, 1, 2, 2, 1, 4, 3, 4, 3, 2, 1]
+    """
+    if not grids:
+        return []
+    slices = _to_slices(grids, n)
+    dead = _propagate(slices, n, len(grids))
+    filled = ((1 << len(grids)) - 1) & ~dead
+    for bits in slices:
+        filled &= _single(bits)
+    solutions = _from_slices(slices, filled, len(grids))
+    for k in range(len(grids)):
+        if not (dead | filled) >> k & 1:
+            # propagation got stuck, so search this grid alone
+            masks = [sum([(bits[s] >> k & 1) << s for s in range(n)])
+                     for bits in slices]
+            found = search(masks, n)
+            solutions[k] = to_values(found[0]) if found else None
+    return solutions
+
+
+def solve_puzzles(puzzles):
+    """
+    Return a solution of each of puzzles, SudokuPuzzles of one size, or
+    None for a puzzle with no solution.
+
+    @type puzzles: list[SudokuPuzzle]
+    @rtype: list[SudokuPuzzle | None]
+
+    >>> from sudoku_puzzle import SudokuPuzzle
+    >>> grid = ["*", "*", "*", "*"]
+    >>> grid += ["*", "*", "A", "*"]
+    >>> grid += ["*", "B", "*", "*"]
+    >>> grid += ["*", "*", "*", "*"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> solution = solve_puzzles([s])[0]
+    >>> solution.is_solved()
+    True
+    >>> print(solution)
+    BA|CD
+    DC|AB
+    -----
+    AB|DC
+    CD|BA
+    """
+    if not puzzles:
+        return []
+    grids = [puzzle.values() for puzzle in puzzles]
+    solutions = solve_batch(grids, round(len(grids[0]) ** (1 / 2)))
+    return [None if solution is None else puzzle.from_values(solution)
+            for puzzle, solution in zip(puzzles, solutions)]
+
+
+def _to_slices(grids, n):
+    """
+    Return the bit slices of grids: for each cell, a list of n ints with
+    bit k of the sth set iff the cell of grid k is empty or holds s + 1.
+
+    @type grids: list[list[int]]
+    @type n: int
+    @rtype: list[list[int]]
+
+    >>> _to_slices([[1, 0, 0, 0], [2, 0, 0, 0]], 2)[0]
+    [1, 2]
+    """
+    # translation tables taking a grid's value to "1" if it allows s + 1
+    # and to "0" otherwise, so that a cell's values across the batch, as
+    # bytes, translate to the binary digits of its slice for s
+    translations = []
+    for s in range(n):
+        table = bytearray(b"0" * 256)
+        table[0] = table[s + 1] = ord("1")
+        translations.append(bytes(table))
+    slices = []
+    for column in zip(*grids):
+        column = bytes(column)[::-1]
+        slices.append([int(column.translate(table), 2)
+                       for table in translations])
+    return slices
+
+
+def _from_slices(slices, filled, count):
+    """
+    Return the values of the count grids of slices, with None for those
+    whose bit in filled is not set.
+
+    @type slices: list[list[int]]
+    @type filled: int
+    @type count: int
+    @rtype: list[list[int] | None]
+
+    >>> _from_slices([[1, 2], [2, 1]], 3, 2)
+    [[1, 2], [2, 1]]
+    """
+    translations = [bytes.maketrans(b"01", bytes([0, s + 1]))
+                    for s in range(len(slices[0]))]
+    columns = []
+    for bits in slices:
+        # each grid's byte is the sum of s + 1 over the symbols s its cell
+        # allows, which for a filled cell is its value
+        total = 0
+        for s, table in enumerate(translations):
+            digits = format(bits[s] & filled, "0{}b".format(count))
+            total += int.from_bytes(digits.encode().translate(table), "big")
+        columns.append(total.to_bytes(count, "little"))
+    return [list(values) if filled >> k & 1 else None
+            for k, values in enumerate(zip(*columns))]
+
+
+def _single(bits):
+    """
+    Return the int whose bit k is set iff exactly one of bits has bit k
+    set.
+
+    @type bits: list[int]
+    @rtype: int
+
+    >>> bin(_single([0b011, 0b110]))
+    '0b101'
+    """
+    once = twice = 0
+    for x in bits:
+        twice |= once & x
+        once |= x
+    return once & ~twice
+
+
+def _propagate(slices, n, count):
+    """
+    Narrow slices of count grids in place by naked and hidden singles, as
+    sudoku_masks.propagate does for one grid, until neither applies.
+    Return the int whose bit k is set iff this shows grid k has no
+    solution.
+
+    @type slices: list[list[int]]
+    @type n: int
+    @type count: int
+    @rtype: int
+
+    >>> slices = _to_slices([[1, 2, 0, 0] + [0] * 12,
+    ...                      [1, 1] + [0] * 14], 4)
+    >>> _propagate(slices, 4, 2)
+    2
+    """
+    units, peers = tables(n)
+    everything = (1 << count) - 1
+    dead = 0
+    # bit k of done[cell] is set once grid k's cell has been filled and
+    # its symbol removed from its peers
+    done = [0] * len(slices)
+    changed = True
+    while changed:
+        changed = False
+        for cell, bits in enumerate(slices):
+            once = twice = 0
+            for x in bits:
+                twice |= once & x
+                once |= x
+            dead |= everything & ~once
+            new = once & ~twice & ~done[cell]
+            if new:
+                done[cell] |= new
+                for s in range(n):
+                    fixed = bits[s] & new
+                    if fixed:
+                        for p in peers[cell]:
+                            if slices[p][s] & fixed:
+                                slices[p][s] &= ~fixed
+                                changed = True
+        if not changed:
+            for unit in units:
+                for s in range(n):
+                    once = twice = 0
+                    for cell in unit:
+                        x = slices[cell][s]
+                        twice |= once & x
+                        once |= x
+                    dead |= everything & ~once
+                    only = once & ~twice
+                    if only:
+                        for cell in unit:
+                            bits = slices[cell]
+                            fixed = bits[s] & only
+                            if fixed:
+                                for t in range(n):
+                                    if t != s and bits[t] & fixed:
+                                        bits[t] &= ~fixed
+                                        changed = True
+    return dead
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+    from sudoku_generator import generate_batch
+    from sudoku_masks import to_masks
+    for difficulty in ("medium", None):
+        grids = [puzzle.values()
+                 for puzzle in generate_batch(2000, 9, difficulty, seed=148)]
+        start = time()
+        for values in grids:
+            search(to_masks(values, 9), 9)
+        end = time()
+        print("{} puzzles one at a time: {} puzzles per second".format(
+            difficulty or "any", len(grids) / (end - start)))
+        start = time()
+        solve_batch(grids, 9)
+        end = time()
+        print("{} puzzles as a batch: {} puzzles per second".format(
+            difficulty or "any", len(grids) / (end - start)))
@@ -0,0 +1,311 @@
+"""
+Canonical forms of sudoku puzzles
+
+Transposing the grid, permuting its bands (groups of subsquare rows) or
+stacks (groups of subsquare columns), permuting the rows within a band or
+the columns within a stack, and relabelling the symbols all map puzzles to
+puzzles with the same solutions, suitably transformed.  The canonical form
+of a puzzle is the least, as a list of values, of all the puzzles these
+map it to, so isomorphic puzzles share one canonical form, and a solution
+of the canonical form maps back to a solution of each of them.
+"""
+import random
+from sudoku_puzzle import SudokuPuzzle
+
+
+class SudokuTransform:
+    """
+    A relabelling of symbols following a transposition and permutation of
+    rows and columns that maps nxn sudoku puzzles to equivalent ones.
+    """
+
+    def __init__(self, n, transpose, rows, columns, symbols):
+        """
+        Create a new SudokuTransform self, which transposes the grid if
+        transpose, then takes its row rows[i] as row i and its column
+        columns[j] as column j, and replaces each value v by symbols[v].
+
+        @type self: SudokuTransform
+        @type n: int
+        @type transpose: bool
+        @type rows: tuple[int]
+        @type columns: tuple[int]
+        @type symbols: tuple[int]
+        @rtype: None
+        """
+        assert symbols[0] == 0 and sorted(symbols) == list(range(n + 1))
+        self.n, self.transpose = n, transpose
+        self.rows, self.columns, self.symbols = rows, columns, symbols
+        # position each position of the result is taken from
+        if transpose:
+            self._source = [c * n + r for r in rows for c in columns]
+        else:
+            self._source = [r * n + c for r in rows for c in columns]
+
+    def __eq__(self, other):
+        """
+        Return whether SudokuTransform self is equivalent to other.
+
+        @type self: SudokuTransform
+        @type other: SudokuTransform | Any
+        @rtype: bool
+
+        >>> t1 = SudokuTransform(1, False, (0,), (0,), (0, 1))
+        >>> t2 = SudokuTransform(1, True, (0,), (0,), (0, 1))
+        >>> t1 == t2
+        False
+        """
+        return (type(self) == type(other) and
+                self.n == other.n and self.transpose == other.transpose and
+                self.rows == other.rows and self.columns == other.columns and
+                self.symbols == other.symbols)
+
+    def apply_values(self, values):
+        """
+        Return the values, as returned by SudokuPuzzle.values, of the
+        puzzle SudokuTransform self maps the puzzle with values to.
+
+        @type self: SudokuTransform
+        @type values: list[int]
+        @rtype: list[int]
+
+        >>> t = SudokuTransform(4, True, (2, 3, 0, 1), (0, 1, 2, 3),
+        ...                     (0, 4, 3, 2, 1))
+        >>> t.apply_values([1, 2, 0, 0] + [0] * 12)
+        [0, 0, 0, 0, 0, 0, 0, 0, 4, 0, 0, 0, 3, 0, 0, 0]
+        """
+        symbols = self.symbols
+        return [symbols[values[m]] for m in self._source]
+
+    def undo_values(self, values):
+        """
+        Return the values of the puzzle SudokuTransform self maps to the
+        puzzle with values.
+
+        @type self: SudokuTransform
+        @type values: list[int]
+        @rtype: list[int]
+
+        >>> t = SudokuTransform(4, True, (2, 3, 0, 1), (0, 1, 2, 3),
+        ...                     (0, 4, 3, 2, 1))
+        >>> values = [1, 2, 0, 0] + [0] * 12
+        >>> t.undo_values(t.apply_values(values)) == values
+        True
+        """
+        inverse = [0] * (self.n + 1)
+        for v, w in enumerate(self.symbols):
+            inverse[w] = v
+        result = [0] * len(values)
+        for m, source in enumerate(self._source):
+            result[source] = inverse[values[m]]
+        return result
+
+    def apply(self, puzzle):
+        """
+        Return the SudokuPuzzle SudokuTransform self maps puzzle to.
+
+        @type self: SudokuTransform
+        @type puzzle: SudokuPuzzle
+        @rtype: SudokuPuzzle
+        """
+        return puzzle.from_values(self.apply_values(puzzle.values()))
+
+    def undo(self, puzzle):
+        """
+        Return the SudokuPuzzle SudokuTransform self maps to puzzle, such
+        as a solution of the original puzzle given one of the puzzle self
+        mapped it to.
+
+        @type self: SudokuTransform
+        @type puzzle: SudokuPuzzle
+        @rtype: SudokuPuzzle
+
+        >>> grid = ["A", "*", "*", "*"]
+        >>> grid += ["*", "*", "B", "*"]
+        >>> grid += ["*", "A", "*", "*"]
+        >>> grid += ["*", "*", "*", "C"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> t = random_transform(4, random.Random(148))
+        >>> t.undo(t.apply(s)) == s
+        True
+        """
+        return puzzle.from_values(self.undo_values(puzzle.values()))
+
+
+def canonical_values(values, n):
+    """
+    Return the canonical form of the nxn puzzle with values, as returned
+    by SudokuPuzzle.values, and a SudokuTransform mapping the puzzle to it.
+
+    The least form is found by choosing the rows of the result in order,
+    keeping every way of reaching the least rows so far, except that ways
+    bound to continue identically are kept once.  Each row is relabelled
+    in order of first appearance, which is the least relabelling.
+
+    @type values: list[int]
+    @type n: int
+    @rtype: (list[int], SudokuTransform)
+
+    >>> values = [0, 0, 0, 3, 2, 0, 0, 0, 0, 0, 0, 0, 0, 4, 0, 0]
+    >>> canonical_values(values, 4)[0]
+    [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 2, 0, 0, 3, 0, 0]
+    >>> t = random_transform(4, random.Random(148))
+    >>> canonical_values(t.apply_values(values), 4)[0]
+    [0, 0, 0, 0, 0, 0, 0, 1, 0, 0, 2, 0, 0, 3, 0, 0]
+    """
+    r = round(n ** (1 / 2))
+    grids = ([values[i * n:(i + 1) * n] for i in range(n)],
+             [values[i::n] for i in range(n)])
+    # the first row of the result fixes the columns: choose them one at a
+    # time from any unused stack, or else from the stack being filled, for
+    # each transposition and each row that may come first
+    states = [(t, (i,), (), {}, 1) for t in (0, 1) for i in range(n)]
+    for j in range(n):
+        least, next_states = n + 1, []
+        for t, rows, columns, labels, label in states:
+            row = grids[t][rows[0]]
+            if j % r == 0:
+                used = {c // r for c in columns}
+                choices = [c for c in range(n) if c // r not in used]
+            else:
+                stack = columns[-1] // r * r
+                choices = [c for c in range(stack, stack + r)
+                           if c not in columns]
+            for c in choices:
+                v = row[c]
+                w = labels.get(v, label) if v else 0
+                if w < least:
+                    least, next_states = w, []
+                if w == least:
+                    if w == label:
+                        new_labels = dict(labels)
+                        new_labels[v] = label
+                        next_states.append((t, rows, columns + (c,),
+                                            new_labels, label + 1))
+                    else:
+                        next_states.append((t, rows, columns + (c,), labels,
+                                            label))
+        states = next_states
+    # then each further row comes from any unused band, or else from the
+    # band being filled
+    for i in range(1, n):
+        least, next_states, seen = None, [], set()
+        for t, rows, columns, labels, label in states:
+            if i % r == 0:
+                used = {x // r for x in rows}
+                choices = [x for x in range(n) if x // r not in used]
+            else:
+                band = rows[-1] // r * r
+                choices = [x for x in range(band, band + r) if x not in rows]
+            grid = grids[t]
+            for x in choices:
+                out, new_labels, new_label = [], labels, label
+                for c in columns:
+                    v = grid[x][c]
+                    if not v:
+                        out.append(0)
+                    elif v in new_labels:
+                        out.append(new_labels[v])
+                    else:
+                        if new_labels is labels:
+                            new_labels = dict(labels)
+                        new_labels[v] = new_label
+                        out.append(new_label)
+                        new_label += 1
+                if least is None or out < least:
+                    least, next_states, seen = out, [], set()
+                if out == least:
+                    # what remains depends only on these
+                    signature = (t, columns, frozenset(rows + (x,)),
+                                 tuple(sorted(new_labels.items())))
+                    if signature not in seen:
+                        seen.add(signature)
+                        next_states.append((t, rows + (x,), columns,
+                                            new_labels, new_label))
+        states = next_states
+    t, rows, columns, labels, label = states[0]
+    # values that do not appear get the remaining labels in order
+    for v in range(1, n + 1):
+        if v not in labels:
+            labels[v] = label
+            label += 1
+    transform = SudokuTransform(n, bool(t), rows, columns,
+                                tuple([0] + [labels[v]
+                                             for v in range(1, n + 1)]))
+    return transform.apply_values(values), transform
+
+
+def canonicalize(puzzle):
+    """
+    Return the canonical form of SudokuPuzzle puzzle, with the same
+    symbols, and the SudokuTransform mapping puzzle to it.
+
+    Puzzles are isomorphic exactly when the values of their canonical
+    forms are equal, so these values can key a cache of solutions shared
+    by isomorphic puzzles.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: (SudokuPuzzle, SudokuTransform)
+
+    >>> grid = ["A", "*", "*", "*"]
+    >>> grid += ["*", "*", "B", "*"]
+    >>> grid += ["*", "A", "*", "*"]
+    >>> grid += ["*", "*", "*", "C"]
+    >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+    >>> canonical, t = canonicalize(s)
+    >>> print(canonical)
+    **|*A
+    *A|**
+    -----
+    **|B*
+    C*|**
+    >>> t.apply(s) == canonical
+    True
+    >>> s2 = random_transform(4, random.Random(148)).apply(s)
+    >>> canonicalize(s2)[0] == canonical
+    True
+    """
+    values = puzzle.values()
+    canonical, transform = canonical_values(values, round(len(values) **
+                                                          (1 / 2)))
+    return puzzle.from_values(canonical), transform
+
+
+def random_transform(n, rng=random):
+    """
+    Return a random SudokuTransform of nxn puzzles, using rng as the
+    source of randomness.
+
+    @type n: int
+    @type rng: random.Random
+    @rtype: SudokuTransform
+
+    >>> t = random_transform(9, random.Random(148))
+    >>> sorted(t.rows) == sorted(t.columns) == list(range(9))
+    True
+    """
+    r = round(n ** (1 / 2))
+
+    def lines():
+        # a random order of bands, each a random order of its lines
+        bands = rng.sample(range(r), r)
+        return tuple(b * r + x for b in bands for x in rng.sample(range(r), r))
+
+    return SudokuTransform(n, rng.random() < 0.5, lines(), lines(),
+                           tuple([0] + rng.sample(range(1, n + 1), n)))
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+    from sudoku_generator import generate_values
+    rng = random.Random(148)
+    originals = [generate_values(9, rng=rng) for _ in range(10)]
+    received = [random_transform(9, rng).apply_values(originals[k % 10])
+                for k in range(100)]
+    start = time()
+    forms = {tuple(canonical_values(values, 9)[0]) for values in received}
+    end = time()
+    print("{} puzzles received, {} distinct up to isomorphism, in {} "
+          "seconds".format(len(received), len(forms), end - start))
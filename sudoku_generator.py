@@ -0,0 +1,198 @@
+"""
+Generate sudoku puzzles with exactly one solution, and grade them
+"""
+import random
+from multiprocessing import Pool
+from sudoku_masks import (to_masks, to_values, propagate, is_filled, search,
+                          count_solutions)
+from sudoku_puzzle import SudokuPuzzle
+
+# difficulties, by the propagation a puzzle needs to be solved:
+# naked singles only, hidden singles as well, or search
+DIFFICULTIES = ("easy", "medium", "hard")
+# default symbols, the first n of which are used for an nxn puzzle
+SYMBOLS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+
+
+def grade(puzzle):
+    """
+    Return the difficulty of SudokuPuzzle puzzle, or None if it does not
+    have exactly one solution.
+
+    @type puzzle: SudokuPuzzle
+    @rtype: str | None
+
+    >>> grid = ["A", "B", "C", "D"]
+    >>> grid += ["C", "D", "A", "B"]
+    >>> grid += ["B", "A", "D", "C"]
+    >>> grid += ["D", "C", "B", "*"]
+    >>> grade(SudokuPuzzle(4, grid, {"A", "B", "C", "D"}))
+    'easy'
+    >>> grade(SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})) is None
+    True
+    """
+    values = puzzle.values()
+    level = _level(values, round(len(values) ** (1 / 2)))
+    return None if level is None else DIFFICULTIES[level]
+
+
+def _level(values, n):
+    """
+    Return the index in DIFFICULTIES of the difficulty of the nxn grid
+    values, or None if it does not have exactly one solution.
+
+    @type values: list[int]
+    @type n: int
+    @rtype: int | None
+    """
+    masks = to_masks(values, n)
+    for level, hidden in enumerate((False, True)):
+        if not propagate(masks, n, hidden):
+            return None
+        if is_filled(masks):
+            return level
+    return 2 if count_solutions(masks, n) == 1 else None
+
+
+def random_grid(n=9, rng=random):
+    """
+    Return the values of a random filled nxn grid, using rng as the
+    source of randomness.
+
+    @type n: int
+    @type rng: random.Random
+    @rtype: list[int]
+
+    >>> values = random_grid(4, random.Random(148))
+    >>> sorted(values[:4]), sorted(values[::4])
+    ([1, 2, 3, 4], [1, 2, 3, 4])
+    """
+    masks = search(to_masks([0] * n * n, n), n,
+                   order=lambda bits: rng.sample(bits, len(bits)))[0]
+    return to_values(masks)
+
+
+def generate_values(n=9, difficulty=None, rng=random):
+    """
+    Return the values of a random nxn puzzle with exactly one solution,
+    no harder than difficulty, from which no clue can be removed without
+    losing one of these properties.
+
+    @type n: int
+    @type difficulty: str | None
+    @type rng: random.Random
+    @rtype: list[int]
+
+    >>> values = generate_values(4, "easy", random.Random(148))
+    >>> _level(values, 4)
+    0
+    """
+    limit = len(DIFFICULTIES) - 1 if difficulty is None else \
+        DIFFICULTIES.index(difficulty)
+    values = random_grid(n, rng)
+    cells = list(range(n * n))
+    rng.shuffle(cells)
+    for cell in cells:
+        value, values[cell] = values[cell], 0
+        if limit == len(DIFFICULTIES) - 1:
+            # only uniqueness matters, and the grid is still a solution, so
+            # the clue is needed iff some other value at cell also solves it
+            masks = to_masks(values, n)
+            masks[cell] &= ~(1 << (value - 1))
+            keep = len(search(masks, n)) > 0
+        else:
+            # easy and medium puzzles are exactly those that propagation
+            # with naked (and hidden) singles fills
+            masks = to_masks(values, n)
+            keep = not (propagate(masks, n, limit > 0) and is_filled(masks))
+        if keep:
+            values[cell] = value
+    return values
+
+
+def generate(n=9, difficulty=None, rng=random, symbols=None):
+    """
+    Return a random nxn SudokuPuzzle with exactly one solution, no harder
+    than difficulty, and with symbols from symbols (by default the first n
+    of SYMBOLS).
+
+    @type n: int
+    @type difficulty: str | None
+    @type rng: random.Random
+    @type symbols: set[str] | None
+    @rtype: SudokuPuzzle
+
+    >>> s = generate(4, rng=random.Random(148))
+    >>> grade(s) is not None
+    True
+    """
+    return _puzzle(generate_values(n, difficulty, rng), n, symbols)
+
+
+def _puzzle(values, n, symbols=None):
+    """
+    Return the nxn SudokuPuzzle whose values are values, with symbols
+    from symbols (by default the first n of SYMBOLS).
+
+    @type values: list[int]
+    @type n: int
+    @type symbols: set[str] | None
+    @rtype: SudokuPuzzle
+    """
+    symbol_set = set(SYMBOLS[:n]) if symbols is None else set(symbols)
+    symbol = ["*"] + sorted(symbol_set)
+    return SudokuPuzzle(n, [symbol[v] for v in values], symbol_set)
+
+
+def _generate_job(args):
+    """
+    Return generate_values(n, difficulty) using a Random seeded with seed.
+
+    @type args: (int, str | None, int)
+    @rtype: list[int]
+    """
+    n, difficulty, seed = args
+    return generate_values(n, difficulty, random.Random(seed))
+
+
+def generate_batch(count, n=9, difficulty=None, processes=None, seed=None,
+                   symbols=None):
+    """
+    Return a list of count distinct puzzles as generate would make them,
+    generated by a pool of processes worker processes.
+
+    @type count: int
+    @type n: int
+    @type difficulty: str | None
+    @type processes: int | None
+    @type seed: int | None
+    @type symbols: set[str] | None
+    @rtype: list[SudokuPuzzle]
+
+    >>> batch = generate_batch(5, 4, processes=2, seed=148)
+    >>> len(batch), len(set(batch))
+    (5, 5)
+    """
+    rng = random.Random(seed)
+    found = {}
+    with Pool(processes) as pool:
+        while len(found) < count:
+            jobs = [(n, difficulty, rng.getrandbits(64))
+                    for _ in range(count - len(found))]
+            for values in pool.imap_unordered(_generate_job, jobs,
+                                              chunksize=8):
+                found.setdefault(tuple(values), values)
+    return [_puzzle(values, n, symbols)
+            for values in list(found.values())[:count]]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    from time import time
+    for n in (9, 16):
+        start = time()
+        batch = generate_batch(1000 if n == 9 else 4, n)
+        end = time()
+        print("generated {} {}x{} puzzles in {} seconds\n\n{}\n".format(
+            len(batch), n, n, end - start, batch[0]))
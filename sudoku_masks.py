@@ -0,0 +1,216 @@
+"""
+Bitmask constraint propagation and search for nxn sudoku grids
+
+A grid is a list of n ** 2 candidate masks in row-major order: bit k of
+a cell's mask is set iff the cell may still hold the (k + 1)th symbol, so
+a cell is filled when its mask has exactly one bit set.
+"""
+
+# n -> (units, peers), shared by every grid of that size
+_TABLES = {}
+
+
+def tables(n):
+    """
+    Return the units (rows, columns and subsquares, as lists of cells)
+    and the peers of each cell (the other cells sharing a unit with it)
+    of an nxn grid.
+
+    @type n: int
+    @rtype: (list[list[int]], list[list[int]])
+
+    >>> units, peers = tables(4)
+    >>> units[0], units[4], units[8]
+    ([0, 1, 2, 3], [0, 4, 8, 12], [0, 1, 4, 5])
+    >>> sorted(peers[0])
+    [1, 2, 3, 4, 5, 8, 12]
+    """
+    if n not in _TABLES:
+        r = round(n ** (1 / 2))
+        units = ([[i * n + j for j in range(n)] for i in range(n)] +
+                 [[i * n + j for i in range(n)] for j in range(n)] +
+                 [[(bi + i) * n + bj + j for i in range(r) for j in range(r)]
+                  for bi in range(0, n, r) for bj in range(0, n, r)])
+        peers = [set() for _ in range(n * n)]
+        for unit in units:
+            for cell in unit:
+                peers[cell].update(unit)
+        _TABLES[n] = units, [sorted(p - {c}) for c, p in enumerate(peers)]
+    return _TABLES[n]
+
+
+def to_masks(values, n):
+    """
+    Return the candidate masks of the nxn grid whose cells hold values,
+    where 0 is an empty cell and k is the kth symbol.
+
+    @type values: list[int]
+    @type n: int
+    @rtype: list[int]
+
+    >>> to_masks([1, 0, 0, 0] * 4, 4)[:2]
+    [1, 15]
+    """
+    full = (1 << n) - 1
+    return [1 << (v - 1) if v else full for v in values]
+
+
+def to_values(masks):
+    """
+    Return the values of the cells of masks, with 0 for cells that are
+    not filled.
+
+    @type masks: list[int]
+    @rtype: list[int]
+
+    >>> to_values([1, 4, 6])
+    [1, 3, 0]
+    """
+    return [m.bit_length() if m & (m - 1) == 0 else 0 for m in masks]
+
+
+def propagate(masks, n, hidden=True):
+    """
+    Narrow masks in place by naked singles (a filled cell's symbol is
+    removed from its peers) and, if hidden, hidden singles (a symbol
+    with one possible cell in a unit goes there) until neither applies.
+    Return False iff this shows masks has no solution.
+
+    @type masks: list[int]
+    @type n: int
+    @type hidden: bool
+    @rtype: bool
+
+    >>> masks = to_masks([1, 2, 0, 0, 3, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0], 4)
+    >>> propagate(masks, 4), to_values(masks)[:8]
+    (True, [1, 2, 0, 0, 3, 4, 0, 0])
+    >>> propagate(to_masks([1, 1] + [0] * 14, 4), 4)
+    False
+    """
+    units, peers = tables(n)
+    full = (1 << n) - 1
+    done = [False] * len(masks)
+    changed = True
+    while changed:
+        changed = False
+        for cell in range(len(masks)):
+            m = masks[cell]
+            if not done[cell] and m & (m - 1) == 0:
+                if m == 0:
+                    return False
+                done[cell] = True
+                for p in peers[cell]:
+                    if masks[p] & m:
+                        masks[p] &= ~m
+                        if masks[p] == 0:
+                            return False
+                        changed = True
+        if hidden and not changed:
+            for unit in units:
+                once = twice = 0
+                for cell in unit:
+                    twice |= once & masks[cell]
+                    once |= masks[cell]
+                if once != full:
+                    return False
+                once &= ~twice
+                if once:
+                    for cell in unit:
+                        m = masks[cell]
+                        if m & once and m & (m - 1):
+                            masks[cell] = m & once
+                            if masks[cell] & (masks[cell] - 1):
+                                return False
+                            changed = True
+    return True
+
+
+def is_filled(masks):
+    """
+    Return whether every cell of masks is filled.
+
+    @type masks: list[int]
+    @rtype: bool
+
+    >>> is_filled([1, 2]), is_filled([1, 3])
+    (True, False)
+    """
+    return all(m & (m - 1) == 0 for m in masks)
+
+
+def search(masks, n, limit=1, order=None):
+    """
+    Return up to limit solutions of masks, each a list of filled masks,
+    branching on a cell with fewest candidates after each propagation.
+
+    order, if given, is called on the candidate bits of a cell and
+    returns them in the order to try.
+
+    @type masks: list[int]
+    @type n: int
+    @type limit: int
+    @type order: (list[int]) -> list[int] | None
+    @rtype: list[list[int]]
+
+    >>> masks = to_masks([0] * 16, 4)
+    >>> len(search(masks, 4, limit=1000))
+    288
+    >>> to_values(search(masks, 4)[0])[:4]
+    [1, 2, 3, 4]
+    """
+    solutions = []
+    _search(masks[:], n, limit, order, solutions)
+    return solutions
+
+
+def _search(masks, n, limit, order, solutions):
+    """
+    Append solutions of masks to solutions until it holds limit of them.
+
+    @type masks: list[int]
+    @type n: int
+    @type limit: int
+    @type order: (list[int]) -> list[int] | None
+    @type solutions: list[list[int]]
+    @rtype: None
+    """
+    if not propagate(masks, n):
+        return
+    best, fewest = -1, n + 1
+    for cell in range(len(masks)):
+        m = masks[cell]
+        if m & (m - 1):
+            count = bin(m).count("1")
+            if count < fewest:
+                best, fewest = cell, count
+                if count == 2:
+                    break
+    if best < 0:
+        solutions.append(masks)
+        return
+    m = masks[best]
+    bits = [1 << k for k in range(n) if m >> k & 1]
+    for bit in (bits if order is None else order(bits)):
+        child = masks[:]
+        child[best] = bit
+        _search(child, n, limit, order, solutions)
+        if len(solutions) >= limit:
+            return
+
+
+def count_solutions(masks, n, limit=2):
+    """
+    Return the number of solutions of masks, counting no further than
+    limit.
+
+    @type masks: list[int]
+    @type n: int
+    @type limit: int
+    @rtype: int
+
+    >>> count_solutions(to_masks([0] * 16, 4), 4)
+    2
+    >>> count_solutions(to_masks([1, 1] + [0] * 14, 4), 4)
+    0
+    """
+    return len(search(masks, n, limit))
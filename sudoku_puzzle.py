@@ -1,4 +1,5 @@
 from puzzle import Puzzle
+from sudoku_masks import tables
 
 
 class SudokuPuzzle(Puzzle):
@@ -22,6 +23,30 @@ class SudokuPuzzle(Puzzle):
         assert len(symbol_set) == n
         assert len(symbols) == n ** 2
         self._n, self._symbols, self._symbol_set = n, symbols, symbol_set
+        # bookkeeping kept up to date by _extend, so that is_solved and
+        # fail_fast need not rescan the grid:
+        # bit of each symbol, masks of symbols used in each row, column
+        # and subsquare, number of "*" positions, number of symbols
+        # repeated within a row, column or subsquare, and number of "*"
+        # positions with no symbol left to put in them
+        self._bit = {d: 1 << k for k, d in enumerate(sorted(symbol_set))}
+        self._rows, self._columns, self._subsquares = [0] * n, [0] * n, [0] * n
+        self._empty, self._conflicts, self._dead = 0, 0, 0
+        for m in range(n ** 2):
+            if symbols[m] == "*":
+                self._empty += 1
+            else:
+                row, column, subsquare = self._units(m)
+                bit = self._bit[symbols[m]]
+                self._conflicts += (bool(self._rows[row] & bit) +
+                                    bool(self._columns[column] & bit) +
+                                    bool(self._subsquares[subsquare] & bit))
+                self._rows[row] |= bit
+                self._columns[column] |= bit
+                self._subsquares[subsquare] |= bit
+        for m in range(n ** 2):
+            if symbols[m] == "*" and not self._allowed(m):
+                self._dead += 1
 
     def __eq__(self, other):
         """
@@ -55,6 +80,24 @@ class SudokuPuzzle(Puzzle):
                 self._n == other._n and self._symbols == other._symbols and
                 self._symbol_set == other._symbol_set)
 
+    def __hash__(self):
+        """
+        Return a hash of SudokuPuzzle self consistent with __eq__.
+
+        @type self: SudokuPuzzle
+        @rtype: int
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s1 = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s2 = SudokuPuzzle(4, grid[:], {"A", "B", "C", "D"})
+        >>> hash(s1) == hash(s2)
+        True
+        """
+        return hash((self._n, tuple(self._symbols)))
+
     def __str__(self):
         """
         Return a human-readable string representation of SudokuPuzzle self.
@@ -130,14 +173,8 @@ class SudokuPuzzle(Puzzle):
         >>> s.is_solved()
         False
         """
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # no "*" left and all rows, column, subsquares have correct symbols
-        return ("*" not in symbols and
-                all([(self._row_set(i) == self._symbol_set and
-                      self._column_set(i) == self._symbol_set and
-                      self._subsquare_set(i) ==
-                      self._symbol_set) for i in range(n ** 2)]))
+        # no "*" left and no row, column, subsquare repeats a symbol
+        return self._empty == 0 and self._conflicts == 0
 
     def extensions(self):
         """
@@ -170,16 +207,10 @@ class SudokuPuzzle(Puzzle):
             # position of first empty position
             i = symbols.index("*")
             # allowed symbols at position i
-            # A | B == A.union(B)
-            allowed_symbols = (self._symbol_set -
-                               (self._row_set(i) |
-                                self._column_set(i) |
-                                self._subsquare_set(i)))
+            allowed = self._allowed(i)
             # list of SudokuPuzzles with each legal digit at position i
-            return (
-                [SudokuPuzzle(n,
-                 symbols[:i] + [d] + symbols[i + 1:], symbol_set)
-                 for d in allowed_symbols])
+            return [self._extend(i, d) for d in sorted(symbol_set)
+                    if self._bit[d] & allowed]
 
     # override fail_fast.
     # Notice that it is not possible to complete a sudoku puzzle if there
@@ -214,69 +245,100 @@ class SudokuPuzzle(Puzzle):
         >>> s2.fail_fast()
         False
         """
+        # a solved puzzle has no "*" positions, so none of them are dead
+        return self._dead > 0
+
+    def values(self):
+        """
+        Return the positions of SudokuPuzzle self as ints, with 0 for "*"
+        and k for the kth smallest symbol in its symbol set.
+
+        @type self: SudokuPuzzle
+        @rtype: list[int]
+
+        >>> grid = ["A", "B", "C", "D"]
+        >>> grid += ["D", "C", "B", "A"]
+        >>> grid += ["*", "D", "*", "*"]
+        >>> grid += ["*", "*", "*", "*"]
+        >>> s = SudokuPuzzle(4, grid, {"A", "B", "C", "D"})
+        >>> s.values()[:10]
+        [1, 2, 3, 4, 4, 3, 2, 1, 0, 4]
+        """
+        value = {d: k + 1 for k, d in enumerate(sorted(self._symbol_set))}
+        value["*"] = 0
+        return [value[d] for d in self._symbols]
 
-        if self.is_solved():
-            return False
+    def from_values(self, values):
+        """
+        Return the SudokuPuzzle with the size and symbol set of SudokuPuzzle
+        self whose positions are values, as returned by values.
 
-        for i in range(0, self._n ** 2):
-            if self._symbols[i] == "*":
-                symbol_all = self._symbol_set.copy() | {"*"}
-                union_set = (self._row_set(i) | self._column_set(
-                    i) | self._subsquare_set(i))
-                if len(symbol_all) - len(union_set) == 0:
-                    return True
+        @type self: SudokuPuzzle
+        @type values: list[int]
+        @rtype: SudokuPuzzle
 
-        return False
+        >>> s = SudokuPuzzle(4, ["*"] * 16, {"A", "B", "C", "D"})
+        >>> print(s.from_values([1, 2, 3, 4] + [0] * 12))
+        AB|CD
+        **|**
+        -----
+        **|**
+        **|**
+        """
+        symbol = ["*"] + sorted(self._symbol_set)
+        return SudokuPuzzle(self._n, [symbol[v] for v in values],
+                            self._symbol_set)
 
         # some helper methods
-    def _row_set(self, m):
-        #
-        # Return set of symbols in row of SudokuPuzzle self's symbols
-        # where position m occurs.
+    def _units(self, m):
+        # Return the row, column and subsquare where position m occurs.
         #
         # @type self: SudokuPuzzle
         # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # first position in m's row
-        r = (m // n) * n
-        # set of elements from symbols[r] .. symbols[r+n-1]
-        return set([symbols[r + i] for i in range(n)])
-
-    def _column_set(self, m):
-        # Return set of symbols in column of SudokuPuzzle self's symbols
-        # where position m occurs.
+        # @rtype: (int, int, int)
+        n = self._n
+        ss = round(n ** (1 / 2))
+        row, col = m // n, m % n
+        return row, col, (row // ss) * ss + col // ss
+
+    def _allowed(self, m):
+        # Return the mask of symbol bits not yet used in the row, column
+        # or subsquare where position m occurs.
         #
         # @type self: SudokuPuzzle
         # @type m: int
-        assert 0 <= m <= self._n ** 2
-        # convenient names
-        symbols, n = self._symbols, self._n
-        # first position in m's column
-        c = m % n
-        # set of elements from symbols[c], symbols[c + n],
-        # ... symbols[c + (n * (n-1))]
-        return set([symbols[c + (i * n)] for i in range(n)])
-
-    def _subsquare_set(self, m):
-        # Return set of symbols in subsquare of SudokuPuzzle self's symbols
-        # where position m occurs.
+        # @rtype: int
+        row, col, subsquare = self._units(m)
+        return ((1 << self._n) - 1) & ~(self._rows[row] | self._columns[col] |
+                                       self._subsquares[subsquare])
+
+    def _extend(self, m, d):
+        # Return the extension of SudokuPuzzle self with symbol d at the
+        # "*" position m, where d is allowed, updating the bookkeeping
+        # from self's instead of rebuilding it.
         #
         # @type self: SudokuPuzzle
         # @type m: int
-        assert 0 <= m < self._n ** 2
-        # convenient names
-        n, symbols = self._n, self._symbols
-        # row, column where m occur
-        row, col = m // n, m % n
-        # length of subsquares
-        ss = round(n ** (1 / 2))
-        # upper-left position of m's subsquare
-        ul = (((row // ss) * ss) * n) + ((col // ss) * ss)
-        # return set of symbols from subsquare starting at ul
-        return set(
-            [symbols[ul + i + n * j] for i in range(ss) for j in range(ss)])
+        # @type d: str
+        # @rtype: SudokuPuzzle
+        n, bit = self._n, self._bit[d]
+        row, col, subsquare = self._units(m)
+        child = SudokuPuzzle.__new__(SudokuPuzzle)
+        child._n, child._symbol_set = n, self._symbol_set
+        child._bit = self._bit
+        child._symbols = self._symbols[:m] + [d] + self._symbols[m + 1:]
+        child._rows, child._columns = self._rows[:], self._columns[:]
+        child._subsquares = self._subsquares[:]
+        child._rows[row] |= bit
+        child._columns[col] |= bit
+        child._subsquares[subsquare] |= bit
+        child._empty, child._conflicts = self._empty - 1, self._conflicts
+        # a "*" peer of m dies iff d was the only symbol left for it
+        child._dead = self._dead
+        for p in tables(n)[1][m]:
+            if child._symbols[p] == "*" and self._allowed(p) == bit:
+                child._dead += 1
+        return child
 
 
 if __name__ == "__main__":
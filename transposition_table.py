@@ -0,0 +1,205 @@
+"""
+A fixed-size table of configurations known to be dead ends
+
+Each entry is one unsigned 64-bit word packing the top 48 bits of a
+64-bit BLAKE2b digest of a configuration's state_key, the depth at which
+it was found dead (capped at MAX_DEPTH), and a flag bit set in every
+occupied entry, so that an all-zero word is an empty slot.  Two different
+keys are mistaken for one another only if their digests agree in the
+bucket index and all 48 stored bits.  In tables of 1 MB or more, with at
+least 2 ** 16 buckets, that takes equal digests, about one chance in
+2 ** 64 for each pair of keys.
+
+Digests are of the key's bytes rather than of hash(key): for ints that is
+the value modulo 2 ** 61 - 1, under which configurations of peg boards
+with more than 61 cells collide.
+"""
+import pickle
+from array import array
+from hashlib import blake2b
+
+# replacement policies: "depth" buckets hold a depth-preferred slot, kept
+# for the entry nearest the root since it stands for the most work, and an
+# always-replace slot; "always" buckets hold one always-replace slot
+POLICIES = ("depth", "always")
+# greatest depth an entry records; deeper entries record MAX_DEPTH
+MAX_DEPTH = (1 << 15) - 1
+
+
+class TranspositionTable:
+    """
+    A table of dead-end configurations taking a fixed amount of memory,
+    forgetting entries as the replacement policy decides once it fills.
+    """
+
+    def __init__(self, megabytes=16, policy="depth"):
+        """
+        Create a new TranspositionTable self taking megabytes MB, which
+        replaces entries by policy, one of POLICIES.
+
+        @type self: TranspositionTable
+        @type megabytes: float
+        @type policy: str
+        @rtype: None
+
+        >>> len(TranspositionTable(1)._slots)
+        131072
+        """
+        if policy not in POLICIES:
+            raise ValueError("unknown policy {!r}".format(policy))
+        self.policy = policy
+        self._ways = 2 if policy == "depth" else 1
+        self._buckets = max(1, int(megabytes * 2 ** 20) // 8 // self._ways)
+        self._slots = array("Q", bytes(8 * self._ways * self._buckets))
+        # occupied slots
+        self.used = 0
+
+    def __len__(self):
+        """
+        Return the number of configurations held by TranspositionTable
+        self.
+
+        @type self: TranspositionTable
+        @rtype: int
+
+        >>> t = TranspositionTable(1)
+        >>> t.mark_dead("a", 3)
+        >>> len(t)
+        1
+        """
+        return self.used
+
+    def _locate(self, key):
+        """
+        Return the first slot of the bucket for key in TranspositionTable
+        self, and the entry key would have with its flag bit set and a
+        depth of 0.
+
+        @type self: TranspositionTable
+        @type key: Hashable
+        @rtype: (int, int)
+        """
+        h = int.from_bytes(blake2b(_key_bytes(key), digest_size=8).digest(),
+                           "little")
+        return (h % self._buckets) * self._ways, (h >> 16 << 16) | 1
+
+    def is_dead(self, key):
+        """
+        Return whether TranspositionTable self holds the configuration
+        with state_key key.
+
+        @type self: TranspositionTable
+        @type key: Hashable
+        @rtype: bool
+
+        >>> t = TranspositionTable(1)
+        >>> t.mark_dead(b"\\x01\\x02", 3)
+        >>> t.is_dead(b"\\x01\\x02"), t.is_dead(b"\\x02\\x01")
+        (True, False)
+        >>> t.mark_dead((1 << 61) | (1 << 5), 3)
+        >>> t.is_dead(1 | (1 << 5))
+        False
+        """
+        return self.depth(key) is not None
+
+    def depth(self, key):
+        """
+        Return the least depth at which TranspositionTable self records
+        the configuration with state_key key dead, capped at MAX_DEPTH, or
+        None if it does not hold it.
+
+        @type self: TranspositionTable
+        @type key: Hashable
+        @rtype: int | None
+
+        >>> t = TranspositionTable(1)
+        >>> t.mark_dead("a", 7)
+        >>> t.mark_dead("a", 3)
+        >>> t.depth("a"), t.depth("b")
+        (3, None)
+        """
+        slot, entry = self._locate(key)
+        slots = self._slots
+        for i in range(slot, slot + self._ways):
+            if slots[i] & ~0xFFFF == entry & ~0xFFFF:
+                return (slots[i] & 0xFFFF) >> 1
+        return None
+
+    def mark_dead(self, key, depth):
+        """
+        Record in TranspositionTable self that the configuration with
+        state_key key, found at depth, cannot be solved.
+
+        With the "depth" policy the entry takes the depth-preferred slot
+        of its bucket if that is empty or holds an entry no nearer the
+        root, moving a displaced entry to the always-replace slot, and
+        otherwise takes the always-replace slot.
+
+        @type self: TranspositionTable
+        @type key: Hashable
+        @type depth: int
+        @rtype: None
+
+        >>> t = TranspositionTable(16 / 2 ** 20)
+        >>> t._buckets
+        1
+        >>> for key, depth in [("a", 5), ("b", 9), ("c", 2), ("d", 7)]:
+        ...     t.mark_dead(key, depth)
+        >>> [key for key in "abcd" if t.is_dead(key)], len(t)
+        (['c', 'd'], 2)
+        """
+        slot, entry = self._locate(key)
+        entry |= min(depth, MAX_DEPTH) << 1
+        slots = self._slots
+        if self._ways == 2:
+            old = slots[slot]
+            if old & ~0xFFFF == entry & ~0xFFFF:
+                slots[slot] = min(old, entry)
+                return
+            if not old or (entry & 0xFFFF) <= (old & 0xFFFF):
+                slots[slot], entry = entry, old
+                if not entry:
+                    self.used += 1
+                    return
+            slot += 1
+            if slots[slot] & ~0xFFFF == entry & ~0xFFFF:
+                slots[slot] = min(slots[slot], entry)
+                return
+        if not slots[slot]:
+            self.used += 1
+        slots[slot] = entry
+
+    def clear(self):
+        """
+        Forget every configuration in TranspositionTable self.
+
+        @type self: TranspositionTable
+        @rtype: None
+
+        >>> t = TranspositionTable(1)
+        >>> t.mark_dead("a", 0)
+        >>> t.clear()
+        >>> t.is_dead("a"), len(t)
+        (False, 0)
+        """
+        self._slots = array("Q", bytes(8 * len(self._slots)))
+        self.used = 0
+
+
+def _key_bytes(key):
+    """
+    Return bytes that identify key, a state_key, among keys of its type.
+
+    @type key: Hashable
+    @rtype: bytes
+
+    >>> _key_bytes(1 << 8), _key_bytes("ab"), _key_bytes(b"ab")
+    (b'\\x00\\x01', b'ab', b'ab')
+    """
+    if isinstance(key, bytes):
+        return key
+    if isinstance(key, str):
+        return key.encode()
+    if isinstance(key, int):
+        return key.to_bytes(key.bit_length() // 8 + 1, "little", signed=True)
+    return pickle.dumps(key, 4)
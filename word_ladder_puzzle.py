@@ -0,0 +1,266 @@
+from puzzle import Puzzle
+
+
+class WordLadderPuzzle(Puzzle):
+    """
+    A word-ladder puzzle that may be solved, unsolved, or even unsolvable.
+    """
+
+    def __init__(self, from_word, to_word, ws, index=None):
+        """
+        Create a new word-ladder puzzle with the aim of stepping
+        from from_word to to_word using words in ws, changing one
+        character at each step.
+
+        index is the result of word_index(ws), which is otherwise built
+        when self is first extended; every extension of self shares it, so
+        callers solving many puzzles over one ws should build it once and
+        pass it in.
+
+        @type self: WordLadderPuzzle
+        @type from_word: str
+        @type to_word: str
+        @type ws: set[str]
+        @type index: dict[str, list[str]] | None
+        @rtype: None
+        """
+        self._from_word, self._to_word, self._word_set = from_word, to_word, ws
+        self._index = index
+
+    def __eq__(self, other):
+        """
+        Return whether WordLadderPuzzle self is equivalent to other.
+
+        @type self: WordLadderPuzzle
+        @type other: WordLadderPuzzle | Any
+        @rtype: bool
+
+        >>> w1 = WordLadderPuzzle("on", "no", {"on", "oo", "no"})
+        >>> w2 = WordLadderPuzzle("on", "no", {"on", "no", "oo"})
+        >>> w3 = WordLadderPuzzle("no", "on", {"on", "no", "oo"})
+        >>> w1 == w2
+        True
+        >>> w1 == w3
+        False
+        """
+        return (type(self) == type(other) and
+                self._from_word == other._from_word and
+                self._to_word == other._to_word and
+                self._word_set == other._word_set)
+
+    def __hash__(self):
+        """
+        Return a hash of WordLadderPuzzle self consistent with __eq__.
+
+        @type self: WordLadderPuzzle
+        @rtype: int
+
+        >>> w1 = WordLadderPuzzle("on", "no", {"on", "oo", "no"})
+        >>> w2 = WordLadderPuzzle("on", "no", {"on", "no", "oo"})
+        >>> hash(w1) == hash(w2)
+        True
+        """
+        return hash((self._from_word, self._to_word))
+
+    def __str__(self):
+        """
+        Return a human-readable string representation of WordLadderPuzzle
+        self.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> w1 = WordLadderPuzzle("on", "no", {"on", "oo", "no"})
+        >>> print(w1)
+        on --> no
+        """
+        return "{} --> {}".format(self._from_word, self._to_word)
+
+    # override extensions
+    # legal extensions are WordLadderPuzzles that have a from_word in ws that
+    # can be reached from this one by changing a single letter
+    def extensions(self):
+        """
+        Return list of extensions of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: list[WordLadderPuzzle]
+
+        >>> w = WordLadderPuzzle("cat", "dog", {"cat", "cot", "cut", "dog"})
+        >>> [str(x) for x in w.extensions()]
+        ['cot --> dog', 'cut --> dog']
+        """
+        return [WordLadderPuzzle(word, self._to_word, self._word_set,
+                                 self._index)
+                for word in self.key_extensions(self._from_word)]
+
+    # override is_solved
+    # this WordLadderPuzzle is solved when _from_word is the same as
+    # _to_word
+    def is_solved(self):
+        """
+        Return whether WordLadderPuzzle self is solved.
+
+        @type self: WordLadderPuzzle
+        @rtype: bool
+
+        >>> WordLadderPuzzle("cat", "cat", {"cat"}).is_solved()
+        True
+        >>> WordLadderPuzzle("cat", "cot", {"cot"}).is_solved()
+        False
+        """
+        return self._from_word == self._to_word
+
+    # override fail_fast
+    # every step lands on a word of ws with the length of _from_word, so
+    # _to_word can only be reached if it is such a word
+    def fail_fast(self):
+        """
+        Return True iff WordLadderPuzzle self can never be solved.
+
+        @type self: WordLadderPuzzle
+        @rtype: bool
+
+        >>> WordLadderPuzzle("cat", "dog", {"dog"}).fail_fast()
+        False
+        >>> WordLadderPuzzle("cat", "door", {"door"}).fail_fast()
+        True
+        """
+        return not self.is_solved() and (
+            len(self._from_word) != len(self._to_word) or
+            self._to_word not in self._word_set)
+
+    # compact keys
+    # puzzles reachable from one another share _to_word and _word_set, so a
+    # configuration is keyed by its _from_word
+
+    def state_key(self):
+        """
+        Return a compact key for the configuration of WordLadderPuzzle self.
+
+        @type self: WordLadderPuzzle
+        @rtype: str
+
+        >>> WordLadderPuzzle("cat", "dog", {"dog"}).state_key()
+        'cat'
+        """
+        return self._from_word
+
+    def from_state_key(self, key):
+        """
+        Return the WordLadderPuzzle towards the same word as self, with the
+        same words, whose configuration has state_key key.
+
+        @type self: WordLadderPuzzle
+        @type key: str
+        @rtype: WordLadderPuzzle
+
+        >>> w = WordLadderPuzzle("cat", "dog", {"dog"})
+        >>> print(w.from_state_key("cot"))
+        cot --> dog
+        """
+        return WordLadderPuzzle(key, self._to_word, self._word_set,
+                                self._index)
+
+    def key_extensions(self, key):
+        """
+        Return the words of ws one letter away from key, in sorted order.
+
+        @type self: WordLadderPuzzle
+        @type key: str
+        @rtype: list[str]
+
+        >>> w = WordLadderPuzzle("cat", "dog", {"cat", "cot", "dot", "dog"})
+        >>> w.key_extensions("cot")
+        ['cat', 'dot']
+        """
+        if self._index is None:
+            self._index = word_index(self._word_set)
+        words = set()
+        for pattern in _patterns(key):
+            words.update(self._index.get(pattern, ()))
+        words.discard(key)
+        return sorted(words)
+
+    def key_is_solved(self, key):
+        """
+        Return whether the configuration with state_key key is solved.
+
+        @type self: WordLadderPuzzle
+        @type key: str
+        @rtype: bool
+
+        >>> WordLadderPuzzle("cat", "dog", {"dog"}).key_is_solved("dog")
+        True
+        """
+        return key == self._to_word
+
+    def key_heuristic(self, key):
+        """
+        Return the number of letters in which key differs from _to_word,
+        which no ladder from key can take fewer steps than.
+
+        @type self: WordLadderPuzzle
+        @type key: str
+        @rtype: int
+
+        >>> WordLadderPuzzle("cat", "dog", {"dog"}).key_heuristic("cot")
+        2
+        """
+        return sum([a != b for a, b in zip(key, self._to_word)])
+
+
+def word_index(ws):
+    """
+    Return a dict mapping each wildcard pattern of the words in ws, that
+    is a word with one letter replaced by "_", to the words matching it.
+
+    @type ws: set[str]
+    @rtype: dict[str, list[str]]
+
+    >>> index = word_index({"cat", "cot", "cut", "dog"})
+    >>> sorted(index["c_t"])
+    ['cat', 'cot', 'cut']
+    """
+    index = {}
+    for word in ws:
+        for pattern in _patterns(word):
+            index.setdefault(pattern, []).append(word)
+    return index
+
+
+def _patterns(word):
+    """
+    Return the wildcard patterns of word.
+
+    @type word: str
+    @rtype: list[str]
+
+    >>> _patterns("cat")
+    ['_at', 'c_t', 'ca_']
+    """
+    return [word[:i] + "_" + word[i + 1:] for i in range(len(word))]
+
+
+if __name__ == "__main__":
+    import doctest
+    doctest.testmod()
+    import sys
+    from puzzle_tools import breadth_first_solve, depth_first_solve
+    from time import time
+    # a file of words, one per line
+    with open(sys.argv[1] if len(sys.argv) > 1 else "words", "r") as words:
+        word_set = set(words.read().split())
+    w = WordLadderPuzzle("same", "cost", word_set, word_index(word_set))
+    start = time()
+    sol = breadth_first_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using breadth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))
+    start = time()
+    sol = depth_first_solve(w)
+    end = time()
+    print("Solving word ladder from same->cost")
+    print("...using depth-first-search")
+    print("Solutions: {} took {} seconds.".format(sol, end - start))